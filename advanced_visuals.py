@@ -1,41 +1,121 @@
 import os
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import pandas as pd
-import seaborn as sns
+import re
+import heapq
+from collections import Counter
+from operator import itemgetter
+from aggregate_cube import build_cube, cube_counts, cube_pivot
+from preprocess import MEDIA_PLACEHOLDERS
 
 OUTPUT = 'outputs'
-os.makedirs(OUTPUT, exist_ok=True)
+WORD = re.compile(r"[^\W\d_][\w']+")  # 2+ chars, starting with a letter
+WORDCLOUD_TOP_N = 200
+WORDCLOUD_CHUNK = 50_000
 
-def generate_wordcloud(df, outpath=os.path.join(OUTPUT,'wordcloud.png')):
-    text = ' '.join(df['message'].astype(str).tolist())
-    wc = WordCloud(width=800, height=400, background_color='white').generate(text)
+# --- render_* draw from precomputed inputs (used by chart_renderer's worker processes) ---
+# wordcloud / matplotlib / seaborn are imported inside the renderers so importing
+# this module (e.g. for word_frequencies) stays cheap. Charts are drawn on bare
+# matplotlib Figures, never through pyplot's global state, so concurrent
+# sessions rendering in one server process can't draw into each other's figures.
+def _ensure_dir(outpath):
+    if os.path.dirname(outpath):
+        os.makedirs(os.path.dirname(outpath), exist_ok=True)
+
+def _no_data(ax, text='(no messages)'):
+    # placeholder for an empty chat, like the wordcloud's '(no words)'
+    ax.text(0.5, 0.5, text, ha='center', va='center', fontsize=14, color='grey')
+    ax.set_axis_off()
+
+def render_wordcloud(words, outpath):
+    """`words` is a {word: count} dict (see word_frequencies) or raw text."""
+    from wordcloud import WordCloud
+    _ensure_dir(outpath)
+    wc = WordCloud(width=800, height=400, background_color='white')
+    if isinstance(words, dict):
+        wc.generate_from_frequencies(words or {'(no words)': 1})
+    else:
+        wc.generate(words)
     wc.to_file(outpath)
     return outpath
 
-def generate_emotion_heatmap(df, outpath=os.path.join(OUTPUT,'emotion_heatmap.png')):
-    df2 = df.copy()
-    df2['hour'] = pd.to_datetime(df2['timestamp']).dt.hour
-    heat = df2.groupby(['hour','emotion']).size().unstack(fill_value=0)
-    plt.figure(figsize=(10,5))
-    sns.heatmap(heat, cmap='coolwarm', annot=True, fmt='d')
-    plt.title('Emotion by Hour')
-    plt.tight_layout()
-    plt.savefig(outpath)
-    plt.close()
+def render_emotion_heatmap(heat, outpath):
+    from matplotlib.figure import Figure
+    import seaborn as sns
+    _ensure_dir(outpath)
+    fig = Figure(figsize=(10,5))
+    ax = fig.subplots()
+    if heat.size:
+        sns.heatmap(heat, cmap='coolwarm', annot=True, fmt='d', ax=ax)
+    else:
+        _no_data(ax)
+    ax.set_title('Emotion by Hour')
+    fig.tight_layout()
+    fig.savefig(outpath)
     return outpath
 
-def generate_emotion_pie_chart(df, outpath=os.path.join(OUTPUT,'emotion_pie.png')):
-    counts = df['emotion'].value_counts()
-    plt.figure(figsize=(6,6))
-    counts.plot.pie(autopct='%1.1f%%', ylabel='')
-    plt.title('Emotion Distribution')
-    plt.tight_layout()
-    plt.savefig(outpath)
-    plt.close()
+def render_emotion_pie_chart(counts, outpath):
+    from matplotlib.figure import Figure
+    _ensure_dir(outpath)
+    fig = Figure(figsize=(6,6))
+    ax = fig.subplots()
+    if counts.sum() > 0:
+        ax.pie(counts.to_numpy(), labels=counts.index.astype(str), autopct='%1.1f%%')
+    else:
+        _no_data(ax)
+    ax.set_title('Emotion Distribution')
+    fig.tight_layout()
+    fig.savefig(outpath)
     return outpath
 
-def show_advanced_graphs(df):
+# --- chart inputs, computed from the DataFrame / aggregate cube ---
+def word_counts(messages, chunksize=WORDCLOUD_CHUNK, stopwords=None):
+    """
+    Counter of lowercased words over a message Series, built chunk by chunk so
+    no chat-sized string is ever materialised. Media placeholders and
+    stopwords (default: wordcloud's STOPWORDS) are skipped.
+    """
+    if stopwords is None:
+        from wordcloud import STOPWORDS as stopwords
+    counts = Counter()
+    for start in range(0, len(messages), chunksize):
+        chunk = messages.iloc[start:start + chunksize].dropna().astype(str).str.lower()
+        chunk = chunk[~chunk.str.strip().isin(MEDIA_PLACEHOLDERS)]
+        counts.update(WORD.findall('\n'.join(chunk)))
+    for w in stopwords:
+        counts.pop(w, None)
+    return counts
+
+def top_words(counts, top_n=WORDCLOUD_TOP_N):
+    return dict(heapq.nlargest(top_n, counts.items(), key=itemgetter(1)))
+
+def word_frequencies(df, top_n=WORDCLOUD_TOP_N):
+    """Top-N {word: count} for the wordcloud."""
+    return top_words(word_counts(df['message']), top_n)
+
+def word_frequencies_by(df, by, top_n=WORDCLOUD_TOP_N):
+    """{group: top-N {word: count}} per sender / emotion, for per-group wordclouds."""
+    return {key: top_words(word_counts(group), top_n) for key, group in df.groupby(by, observed=True)['message']}
+
+def emotion_heatmap_data(cube):
+    heat = cube_pivot(cube, 'hour', 'emotion')
+    heat.index = heat.index.astype(int)
+    return heat
+
+def emotion_pie_data(cube):
+    return cube_counts(cube, 'emotion').sort_values(ascending=False)
+
+def generate_wordcloud(df, outpath=os.path.join(OUTPUT,'wordcloud.png')):
+    return render_wordcloud(word_frequencies(df), outpath)
+
+def generate_emotion_heatmap(df, outpath=os.path.join(OUTPUT,'emotion_heatmap.png'), cube=None):
+    cube = build_cube(df) if cube is None else cube
+    return render_emotion_heatmap(emotion_heatmap_data(cube), outpath)
+
+def generate_emotion_pie_chart(df, outpath=os.path.join(OUTPUT,'emotion_pie.png'), cube=None):
+    cube = build_cube(df) if cube is None else cube
+    return render_emotion_pie_chart(emotion_pie_data(cube), outpath)
+
+def show_advanced_graphs(df, cube=None):
+    cube = build_cube(df) if cube is None else cube
     generate_wordcloud(df)
-    generate_emotion_heatmap(df)
-    generate_emotion_pie_chart(df)
+    generate_emotion_heatmap(df, cube=cube)
+    generate_emotion_pie_chart(df, cube=cube)
@@ -0,0 +1,179 @@
+"""
+Headless batch analysis of many WhatsApp exports.
+
+Each .txt export is parsed, translated, classified and summarised on a process
+pool (one chat per task, so a worker only ever holds one chat in memory), and
+written to the output directory as:
+
+    <name>.parquet      analyzed messages (chat_store format)
+    <name>.stats.json   summary statistics, written last = completion marker
+    <name>.pdf          optional report (--pdf; not written for empty chats)
+
+Re-running skips chats whose outputs already exist (the stats file is written
+last), so an interrupted run resumes where it stopped.
+
+    python batch_analyze.py exports/ --out results/ --workers 4 --pdf
+    python batch_analyze.py "exports/**/*.txt" --out results/
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+DEFAULT_OUT = os.path.join('outputs', 'batch')
+
+
+def find_exports(inputs):
+    """Expand directories (recursively) and glob patterns into a sorted list of .txt files."""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.update(glob.glob(os.path.join(item, '**', '*.txt'), recursive=True))
+        else:
+            paths.update(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+    return sorted(paths)
+
+
+def output_names(paths):
+    """Stable, collision-free output names: the path relative to the inputs' common directory."""
+    if not paths:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    return {p: os.path.splitext(os.path.relpath(os.path.abspath(p), root))[0].replace(os.sep, '__')
+            for p in paths}
+
+
+def outputs_for(name, out_dir, pdf=False):
+    files = {'parquet': os.path.join(out_dir, f"{name}.parquet"),
+             'stats': os.path.join(out_dir, f"{name}.stats.json")}
+    if pdf:
+        files['pdf'] = os.path.join(out_dir, f"{name}.pdf")
+    return files
+
+
+def is_done(name, out_dir, pdf=False):
+    files = outputs_for(name, out_dir, pdf)
+    if not os.path.exists(files['stats']):
+        return False
+    if pdf and not os.path.exists(files['pdf']):
+        # an earlier run without --pdf; empty chats never get one
+        with open(files['stats'], encoding='utf-8') as f:
+            return json.load(f).get('total_messages', 0) == 0
+    return True
+
+
+def analyze_file(path, name, out_dir, translate=True, pdf=False):
+    """Analyze one export and write its outputs; returns a small result dict."""
+    from preprocess import clean_chat, compact_chat
+    from utils.hinglish_translation import translate_series
+    from emotion_classifier import get_emotions
+    from aggregate_cube import build_cube, cube_counts
+    from chat_statistics import get_chat_stats
+    from chat_store import save_analysis
+    from risk_index import RiskIndex
+
+    t0 = time.perf_counter()
+    files = outputs_for(name, out_dir, pdf)
+    df = clean_chat(Path(path))
+    if translate:
+        df['message'] = translate_series(df['message'])
+    # one process per chat already; don't nest another pool inside the worker
+    df = compact_chat(get_emotions(df, workers=1))
+    cube = build_cube(df)
+    risk = RiskIndex.from_frame(df)
+    save_analysis(df, files['parquet'])
+
+    if pdf and len(df):
+        from chart_renderer import render_charts
+        from generate_pdf_report import generate_pdf_report
+        charts = render_charts(df, cube, charts=('emotion_trend', 'wordcloud', 'emotion_heatmap'),
+                               out_dir=os.path.join(out_dir, 'charts'), workers=1)
+        generate_pdf_report(df, files['pdf'], cube=cube, charts=charts)
+
+    stats = get_chat_stats(df, cube=cube)
+    stats.update({
+        'source': os.path.abspath(path),
+        'emotion_counts': {k: int(v) for k, v in cube_counts(cube, 'emotion').items()},
+        'first_message': str(df['timestamp'].min()) if len(df) else None,
+        'last_message': str(df['timestamp'].max()) if len(df) else None,
+        'date_format': df.attrs.get('date_format'),
+        'parse_failures': int(df.attrs.get('parse_failures', 0)),
+        'urgent_messages': risk.count('urgent'),
+        'risk_scores': risk.risk_scores().to_dict('records'),
+        'seconds': round(time.perf_counter() - t0, 3),
+    })
+    tmp = files['stats'] + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2, default=str)
+    os.replace(tmp, files['stats'])
+    return {'messages': len(df), 'bytes': os.path.getsize(path), 'seconds': stats['seconds']}
+
+
+def _run_one(job):
+    path, name, out_dir, translate, pdf = job
+    try:
+        return path, analyze_file(path, name, out_dir, translate, pdf), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def run_batch(inputs, out_dir=DEFAULT_OUT, workers=None, translate=True, pdf=False, max_tasks_per_child=20):
+    """Analyze every export matched by `inputs`; returns a summary dict."""
+    paths = find_exports(inputs)
+    names = output_names(paths)
+    os.makedirs(out_dir, exist_ok=True)
+    todo = [(p, names[p], out_dir, translate, pdf) for p in paths if not is_done(names[p], out_dir, pdf)]
+    summary = {'found': len(paths), 'skipped': len(paths) - len(todo), 'done': 0, 'failed': [],
+               'messages': 0, 'bytes': 0}
+    print(f"{len(paths)} exports found, {summary['skipped']} already done, {len(todo)} to analyze")
+
+    t0 = time.perf_counter()
+    workers = workers or min(len(todo), os.cpu_count() or 1)
+    if todo:
+        # recycling workers returns memory fragmented by large chats to the OS
+        with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=max_tasks_per_child) as pool:
+            futures = [pool.submit(_run_one, job) for job in todo]
+            for i, fut in enumerate(as_completed(futures), 1):
+                path, result, error = fut.result()
+                if error:
+                    summary['failed'].append((path, error))
+                    print(f"[{i}/{len(todo)}] FAILED {path}: {error}", file=sys.stderr)
+                    continue
+                summary['done'] += 1
+                summary['messages'] += result['messages']
+                summary['bytes'] += result['bytes']
+                print(f"[{i}/{len(todo)}] {path}: {result['messages']} messages in {result['seconds']:.2f}s")
+
+    elapsed = time.perf_counter() - t0
+    summary['seconds'] = round(elapsed, 3)
+    if elapsed > 0 and summary['done']:
+        print(f"{summary['done']} chats, {summary['messages']:,} messages, "
+              f"{summary['bytes'] / 2**20:.1f} MB in {elapsed:.1f}s "
+              f"({summary['done'] / elapsed:.2f} chats/s, {summary['messages'] / elapsed:,.0f} messages/s, "
+              f"{workers} workers)")
+    if summary['failed']:
+        print(f"{len(summary['failed'])} chats failed", file=sys.stderr)
+    return summary
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('inputs', nargs='+', help='directories or glob patterns of .txt exports')
+    ap.add_argument('--out', default=DEFAULT_OUT, help=f'output directory (default: {DEFAULT_OUT})')
+    ap.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    ap.add_argument('--pdf', action='store_true', help='also write a PDF report per chat')
+    ap.add_argument('--no-translate', action='store_true', help='skip Hinglish translation')
+    ap.add_argument('--max-tasks-per-child', type=int, default=20,
+                    help='restart a worker after this many chats to bound its memory')
+    args = ap.parse_args(argv)
+    summary = run_batch(args.inputs, args.out, args.workers, not args.no_translate, args.pdf,
+                        args.max_tasks_per_child)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Throughput benchmark + label regression check for emotion_classifier.
+
+Compares the original per-row classifier (KEYMAP loop + TextBlob per message)
+with the two-stage get_emotions path on a seeded synthetic chat corpus and
+fails if any label differs.
+
+    python benchmarks/bench_emotion_classifier.py [n_messages]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from textblob import TextBlob
+
+from emotion_classifier import KEYMAP, get_emotions
+
+PHRASES = [
+    "ok", "haha", "lol", "<Media omitted>", "good morning", "where are you?", "see you soon",
+    "I'm so tired today", "that movie was terrible", "what a beautiful day :)", "not bad at all",
+    "kal milte hai", "call me when free", "this is really annoying", "I feel hopeless",
+    "exams are stressing me out", "love you guys", "that's great news!", "meh", "ugh :(",
+    "the food was awful", "nice one", "thanks a lot", "I can't sleep", "are you coming tonight?",
+]
+
+
+def reference_classify(text):
+    # the classifier as it was before the two-stage pipeline
+    if not text or not isinstance(text, str):
+        return 'neutral'
+    lower = text.lower()
+    for label, words in KEYMAP.items():
+        for w in words:
+            if w in lower:
+                return label
+    try:
+        polarity = TextBlob(text).sentiment.polarity
+        if polarity > 0.25:
+            return 'happy'
+        if polarity < -0.25:
+            return 'sad'
+    except Exception:
+        pass
+    return 'neutral'
+
+
+def make_corpus(n, seed=42):
+    rng = random.Random(seed)
+    msgs = []
+    for _ in range(n):
+        parts = rng.sample(PHRASES, rng.randint(1, 3))
+        msg = ' '.join(parts)
+        if rng.random() < 0.3:
+            msg += f" {rng.randint(1, 10_000)}"  # keep some messages unique
+        msgs.append(msg)
+    return pd.DataFrame({'message': msgs})
+
+
+def main(n=20_000):
+    df = make_corpus(n)
+
+    t0 = time.perf_counter()
+    expected = df['message'].apply(reference_classify)
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    got = get_emotions(df, use_cache=False)['emotion']
+    t_new = time.perf_counter() - t0
+
+    mismatches = int((expected != got).sum())
+    print(f"messages: {n}")
+    print(f"reference:  {t_ref:.2f}s  ({n / t_ref:,.0f} msg/s)")
+    print(f"two-stage:  {t_new:.2f}s  ({n / t_new:,.0f} msg/s)  speedup x{t_ref / t_new:.1f}")
+    print(f"label mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
@@ -0,0 +1,50 @@
+"""
+Scaling benchmark for utils.hinglish_translation.
+
+Times translate_series over corpora of growing size with lexicons of growing
+size. Time should grow with the corpus and stay flat across lexicon sizes.
+
+    python benchmarks/bench_hinglish_translation.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from utils.hinglish_translation import Translator, load_lexicon
+
+WORDS = ["mujhe", "bahut", "nahi,", "kya", "hua", "aaj", "I", "am", "so", "tired", "bro", "ok", "haan!", "kal", "milte", "hai"]
+
+
+def make_corpus(n, seed=0):
+    rng = random.Random(seed)
+    return pd.Series([' '.join(rng.choices(WORDS, k=rng.randint(2, 12))) + f" {rng.randint(0, n)}" for _ in range(n)])
+
+
+def make_lexicon(size, seed=0):
+    rng = random.Random(seed)
+    lexicon = load_lexicon()
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    while len(lexicon) < size:
+        lexicon[''.join(rng.choices(letters, k=rng.randint(4, 9)))] = 'x'
+    return lexicon
+
+
+def main():
+    print(f"{'messages':>10} {'lexicon':>8} {'seconds':>8} {'msg/s':>10}")
+    for n in (10_000, 100_000):
+        corpus = make_corpus(n)
+        for size in (100, 10_000, 50_000):
+            translator = Translator(make_lexicon(size))
+            t0 = time.perf_counter()
+            translator.translate_series(corpus)
+            dt = time.perf_counter() - t0
+            print(f"{n:>10} {size:>8} {dt:>8.3f} {n / dt:>10,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Import-time budget check for the analyzer modules.
+
+Imports each module in a fresh interpreter with `python -X importtime`, from an
+empty working directory, and fails if
+  - the import takes longer than the budget,
+  - it pulls in a heavy plotting/PDF/NLP library (those must be imported lazily,
+    inside the functions that use them), or
+  - it leaves files behind (no import-time side effects such as makedirs).
+
+    python benchmarks/bench_import_time.py [--budget-ms 1500]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    'preprocess', 'emotion_classifier', 'intent_detector', 'utils.hinglish_translation',
+    'aggregate_cube', 'chat_statistics', 'emotion_trend', 'advanced_visuals', 'chart_renderer',
+    'export_utils', 'generate_pdf_report', 'chat_store', 'incremental', 'transformer_emotion',
+    'chatbot_response', 'batch_analyze', 'job_pool', 'risk_index', 'chatbot_service',
+    'emotion_forecaster', 'label_cache', 'keyword_matcher', 'instrumentation',
+]
+HEAVY = ['matplotlib', 'seaborn', 'wordcloud', 'plotly', 'reportlab', 'textblob', 'openpyxl',
+         'torch', 'transformers']
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(module):
+    """(cumulative ms, top-level packages imported, files created) for one cold import."""
+    with tempfile.TemporaryDirectory() as cwd:
+        env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                              cwd=cwd, env=env, capture_output=True, text=True)
+        if proc.returncode:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+        created = os.listdir(cwd)
+    total_us, packages = 0, set()
+    for m in LINE.finditer(proc.stderr):
+        cumulative, depth, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        packages.add(name.split('.')[0])
+        if depth == 1:  # a direct import of the -c statement
+            total_us += cumulative
+    return total_us / 1000, packages, created
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--budget-ms', type=float, default=1500.0, help='max cold import time per module')
+    ap.add_argument('modules', nargs='*', default=MODULES)
+    args = ap.parse_args(argv)
+
+    failures = 0
+    for module in args.modules:
+        ms, packages, created = import_profile(module)
+        problems = []
+        if ms > args.budget_ms:
+            problems.append(f"over budget ({args.budget_ms:.0f} ms)")
+        heavy = sorted(p for p in HEAVY if p in packages)
+        if heavy:
+            problems.append("imports " + ', '.join(heavy))
+        if created:
+            problems.append("creates " + ', '.join(created))
+        failures += bool(problems)
+        print(f"{module:<28} {ms:8.1f} ms  {'FAIL: ' + '; '.join(problems) if problems else 'ok'}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
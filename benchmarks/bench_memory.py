@@ -0,0 +1,50 @@
+"""
+Per-session memory of an analyzed chat: legacy layout vs the compact schema.
+
+Legacy: object sender/message/emotion columns plus the Date/Emotion aliases
+that ensure_date_emotion used to add to the DataFrame kept in session state.
+Compact: preprocess.compact_chat (categorical sender/emotion, Arrow-backed
+message). Sizes are deep memory_usage of the DataFrame a session holds.
+
+    python benchmarks/bench_memory.py [n_lines]
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_chat import write_chat
+
+
+def mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def main(n_lines=500_000):
+    from preprocess import clean_chat, compact_chat
+    from emotion_classifier import get_emotions
+    from emotion_trend import ensure_date_emotion
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = get_emotions(clean_chat(Path(write_chat(os.path.join(tmp, 'chat.txt'), n_lines))), use_cache=False)
+
+    legacy = df.astype({'sender': object, 'message': object, 'emotion': object})
+    legacy = ensure_date_emotion(legacy.copy())
+    compact = compact_chat(df)
+
+    print(f"messages: {len(df):,}")
+    print(f"{'column':<10} {'legacy MB':>10} {'compact MB':>11}")
+    legacy_cols = legacy.memory_usage(deep=True, index=False) / 2**20
+    compact_cols = compact.memory_usage(deep=True, index=False) / 2**20
+    for col in legacy.columns:
+        print(f"{col:<10} {legacy_cols[col]:>10.1f} {compact_cols.get(col, 0.0):>11.1f}")
+    print(f"{'total':<10} {mb(legacy):>10.1f} {mb(compact):>11.1f}   x{mb(legacy) / mb(compact):.1f} smaller")
+    print("dtypes:", ', '.join(f"{c}={t}" for c, t in compact.dtypes.items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000))
@@ -0,0 +1,140 @@
+"""
+End-to-end pipeline benchmark on a seeded synthetic WhatsApp export.
+
+Times each stage (clean_chat, Hinglish translation, get_emotions, the optional
+transformer classifier, static chart rendering, PDF report) and reports
+seconds, rows/s and the process's peak RSS after the stage. Results are saved
+as JSON; pass --baseline to compare against an earlier run and exit non-zero
+when a stage is slower than the allowed ratio.
+
+    python benchmarks/bench_pipeline.py --lines 100000 --out results.json
+    python benchmarks/bench_pipeline.py --lines 100000 --baseline results.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_chat import STYLES, write_chat
+
+TRANSFORMER_SAMPLE = 2_000  # the transformer stage runs on a sample; it dominates otherwise
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_stage(results, name, fn, rows):
+    t0 = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - t0
+    results[name] = {
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'rows_per_s': round(rows / seconds) if seconds > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    print(f"{name:<14} {seconds:9.3f}s  {results[name]['rows_per_s'] or 0:>12,} rows/s"
+          f"  peak RSS {results[name]['peak_rss_mb']} MB")
+    return out
+
+
+def has_transformer():
+    return all(importlib.util.find_spec(m) for m in ('torch', 'transformers'))
+
+
+def run(lines, seed=0, style='mixed', workdir=None):
+    from preprocess import clean_chat
+    from utils.hinglish_translation import translate_series
+    from emotion_classifier import get_emotions
+    from aggregate_cube import build_cube
+    from chart_renderer import render_charts
+    from generate_pdf_report import generate_pdf_report
+
+    workdir = workdir or tempfile.mkdtemp(prefix='bench_pipeline_')
+    chat = write_chat(os.path.join(workdir, 'chat.txt'), lines, seed, style)
+    stages = {}
+
+    df = run_stage(stages, 'clean_chat', lambda: clean_chat(Path(chat)), lines)
+    n = len(df)
+    df['message'] = run_stage(stages, 'translate', lambda: translate_series(df['message']), n)
+    df = run_stage(stages, 'get_emotions', lambda: get_emotions(df, use_cache=False, workers=1), n)
+    if has_transformer():
+        from transformer_emotion import predict_with_transformer
+        sample = df.head(TRANSFORMER_SAMPLE)
+        run_stage(stages, 'transformer', lambda: predict_with_transformer(sample, use_cache=False), len(sample))
+    else:
+        print("transformer    skipped (torch/transformers not installed)")
+    cube = run_stage(stages, 'build_cube', lambda: build_cube(df), n)
+    charts = run_stage(stages, 'render_charts',
+                       lambda: render_charts(df, cube, out_dir=os.path.join(workdir, 'charts')), n)
+    run_stage(stages, 'pdf_report',
+              lambda: generate_pdf_report(df, os.path.join(workdir, 'report.pdf'), cube=cube, charts=charts), n)
+
+    return {
+        'meta': {'lines': lines, 'messages': n, 'seed': seed, 'style': style,
+                 'python': platform.python_version(), 'platform': platform.platform(),
+                 'cpus': os.cpu_count(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'stages': stages,
+    }
+
+
+def compare(result, baseline, max_ratio):
+    """Print per-stage time ratios against a baseline; return names of regressed stages."""
+    regressed = []
+    print(f"\n{'stage':<14} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for name, now in result['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if not before or not before['seconds']:
+            print(f"{name:<14} {'-':>10} {now['seconds']:>9.3f}s")
+            continue
+        ratio = now['seconds'] / before['seconds']
+        flag = '  REGRESSION' if ratio > max_ratio else ''
+        print(f"{name:<14} {before['seconds']:>9.3f}s {now['seconds']:>9.3f}s {ratio:>6.2f}x{flag}")
+        if flag:
+            regressed.append(name)
+    if baseline.get('meta', {}).get('lines') != result['meta']['lines']:
+        print("note: baseline was run with a different --lines; ratios are not comparable")
+    return regressed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--lines', type=int, default=100_000, help='export lines to generate (10k - 10M)')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--style', choices=STYLES, default='mixed')
+    ap.add_argument('--out', default='bench_results.json', help='where to write the JSON results')
+    ap.add_argument('--baseline', help='earlier results JSON to compare against')
+    ap.add_argument('--max-ratio', type=float, default=1.25, help='slowdown that counts as a regression')
+    args = ap.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)  # read first: --out may point at the same file
+
+    result = run(args.lines, args.seed, args.style)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {args.out}")
+
+    if baseline is not None:
+        return 1 if compare(result, baseline, args.max_ratio) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
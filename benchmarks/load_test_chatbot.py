@@ -0,0 +1,95 @@
+"""
+Load test for chatbot_service: many concurrent sessions against one service.
+
+The default backend simulates a local model whose batch latency is
+`--base-ms + n * --per-item-ms`, so micro-batching and the latency budget
+(with rule-based fallback) can be observed without a GPU.
+
+    python benchmarks/load_test_chatbot.py --users 100 --messages 10 --budget-ms 300
+    python benchmarks/load_test_chatbot.py --backend rules
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_service import ChatbotService, RuleBasedBackend, backend_from_env
+
+MESSAGES = ["I feel sad today", "exams are so stressful", "I'm happy!", "can you help me", "hi",
+            "nobody listens to me", "had a great day", "I can't sleep"]
+
+
+class SimulatedModelBackend:
+    """Async stand-in for a batched model: fixed cost per batch plus a per-item cost."""
+
+    def __init__(self, base_ms=40.0, per_item_ms=2.0):
+        self.base = base_ms / 1000
+        self.per_item = per_item_ms / 1000
+
+    async def generate_batch(self, requests):
+        await asyncio.sleep(self.base + self.per_item * len(requests))
+        return [f"(model) {r.text[::-1]}" for r in requests]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+async def user(service, uid, messages, think_ms, latencies, rng):
+    for _ in range(messages):
+        await asyncio.sleep(rng.uniform(0, think_ms) / 1000)
+        t0 = time.perf_counter()
+        await service.respond(f"user-{uid}", rng.choice(MESSAGES), emotion=rng.choice([None, 'sad', 'happy']))
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+
+async def run(args):
+    if args.backend == 'sim':
+        backend = SimulatedModelBackend(args.base_ms, args.per_item_ms)
+    elif args.backend == 'rules':
+        backend = RuleBasedBackend()
+    else:
+        backend = backend_from_env(args.backend)
+    service = ChatbotService(backend, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                             budget_ms=args.budget_ms)
+    await service.start()
+    rng = random.Random(args.seed)
+    latencies = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user(service, u, args.messages, args.think_ms, latencies, random.Random(rng.random()))
+                           for u in range(args.users)))
+    elapsed = time.perf_counter() - t0
+    await service.stop()
+
+    s = service.stats
+    print(f"requests: {s['requests']} from {args.users} sessions in {elapsed:.2f}s ({s['requests'] / elapsed:,.0f} req/s)")
+    print(f"latency ms: p50 {percentile(latencies, 50):.1f}  p99 {percentile(latencies, 99):.1f}  "
+          f"max {max(latencies):.1f}  mean {statistics.fmean(latencies):.1f}")
+    print(f"batches: {s['batches']}  mean batch size {s['batched_requests'] / max(s['batches'], 1):.1f}  "
+          f"fallbacks: {s['fallbacks']} ({s['fallbacks'] / max(s['requests'], 1):.1%})  backend errors: {s['errors']}")
+    print(f"sessions kept: {len(service.sessions)}  history per session <= {service.history_turns} turns")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--users', type=int, default=100)
+    ap.add_argument('--messages', type=int, default=10, help='messages per user')
+    ap.add_argument('--think-ms', type=float, default=1000.0, help='max random pause between a user\'s messages')
+    ap.add_argument('--backend', default='sim', help="'sim' (simulated model), 'rules', or a CHATBOT_BACKEND spec")
+    ap.add_argument('--base-ms', type=float, default=40.0)
+    ap.add_argument('--per-item-ms', type=float, default=2.0)
+    ap.add_argument('--max-batch', type=int, default=32)
+    ap.add_argument('--max-wait-ms', type=float, default=10.0)
+    ap.add_argument('--budget-ms', type=float, default=300.0)
+    ap.add_argument('--seed', type=int, default=0)
+    asyncio.run(run(ap.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
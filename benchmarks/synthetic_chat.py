@@ -0,0 +1,84 @@
+"""
+Seeded synthetic WhatsApp export generator for benchmarks.
+
+Produces realistic-looking exports: multi-line messages, media placeholders,
+Hinglish, emoji and a choice of date styles (including files that mix 2/4
+digit years and 12h/24h clocks).
+
+    python benchmarks/synthetic_chat.py 1000000 out.txt [--seed 0] [--style mixed]
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+SENDERS = ["Aarav", "Priya", "Rahul", "Sneha", "John", "Jane", "Vikram", "Ananya", "+91 98765 43210"]
+PHRASES = [
+    "ok", "haha", "lol", "good morning", "gn", "where are you?", "on my way", "see you soon",
+    "I'm so tired today", "feeling really low tbh", "that's great news!", "love you guys",
+    "exams are stressing me out", "I feel hopeless", "this is so annoying", "not bad at all",
+    "mujhe bahut dard hai", "kya hua?", "nahi yaar", "acha theek hai", "kal milte hai",
+    "main bahut udaas hoon", "pareshan mat ho", "haan bhai", "kyu nahi?", "😂😂", "❤️", "🙏",
+    "can someone help me with this", "I want to sleep for a week", "happy birthday!! 🎉",
+]
+MEDIA = ["<Media omitted>", "image omitted", "sticker omitted", "This message was deleted"]
+STYLES = ("dmy24", "dmy12", "mdy12", "mixed")
+
+
+def _stamp(ts, style, rng):
+    if style == "mixed":
+        style = rng.choice(("dmy24", "dmy12"))
+        year = ts.strftime("%Y") if rng.random() < 0.5 else ts.strftime("%y")
+    else:
+        year = ts.strftime("%Y")
+    if style == "mdy12":
+        date = f"{ts.month}/{ts.day}/{year}"
+    else:
+        date = f"{ts.day:02d}/{ts.month:02d}/{year}"
+    if style == "dmy24":
+        clock = ts.strftime("%H:%M")
+    else:
+        clock = f"{ts.hour % 12 or 12}:{ts.minute:02d} {'am' if ts.hour < 12 else 'pm'}"
+    return f"{date}, {clock}"
+
+
+def iter_lines(n_lines, seed=0, style="mixed", start=datetime(2021, 1, 1)):
+    """Yield exactly n_lines export lines (headers and continuation lines)."""
+    rng = random.Random(seed)
+    ts = start
+    produced = 0
+    while produced < n_lines:
+        ts += timedelta(seconds=rng.randint(0, 1800))
+        roll = rng.random()
+        if roll < 0.08:
+            body = [rng.choice(MEDIA)]
+        else:
+            body = [' '.join(rng.choices(PHRASES, k=rng.randint(1, 4)))]
+            if roll > 0.93:  # multi-line message
+                body += [rng.choice(PHRASES) for _ in range(rng.randint(1, 3))]
+        lines = [f"{_stamp(ts, style, rng)} - {rng.choice(SENDERS)}: {body[0]}"] + body[1:]
+        for line in lines[:n_lines - produced]:
+            yield line
+            produced += 1
+
+
+def write_chat(path, n_lines, seed=0, style="mixed"):
+    with open(path, "w", encoding="utf-8") as f:
+        batch = []
+        for line in iter_lines(n_lines, seed, style):
+            batch.append(line)
+            if len(batch) >= 100_000:
+                f.write('\n'.join(batch) + '\n')
+                batch = []
+        if batch:
+            f.write('\n'.join(batch) + '\n')
+    return path
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("lines", type=int)
+    ap.add_argument("out")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--style", choices=STYLES, default="mixed")
+    args = ap.parse_args()
+    write_chat(args.out, args.lines, args.seed, args.style)
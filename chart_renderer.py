@@ -0,0 +1,118 @@
+# Render service for the static (PNG) charts used by the PNG bundle and the PDF report.
+# Chart inputs (aggregate-cube slices, word frequencies) are computed once, each PNG is keyed by a hash
+# of its input and the renderer version so unchanged charts are never redrawn, and missing charts are
+# drawn with matplotlib's non-interactive Agg backend (optionally on a spawned process pool).
+# The chart directory keeps the CHART_CACHE_FILES most recently used images.
+import hashlib
+import importlib
+import os
+import threading
+
+import pandas as pd
+
+from aggregate_cube import build_cube
+from instrumentation import input_rows, note, stage
+
+CHART_DIR = os.path.join('outputs', 'charts')
+CHART_CACHE_FILES = 200
+# bump when a renderer's output changes (style, labels), so cached PNGs are redrawn
+RENDERER_VERSION = 3
+# name -> (module, render function); functions take (input, outpath)
+RENDERERS = {
+    'emotion_trend': ('emotion_trend', 'render_emotion_trend_png'),
+    'wordcloud': ('advanced_visuals', 'render_wordcloud'),
+    'emotion_heatmap': ('advanced_visuals', 'render_emotion_heatmap'),
+    'emotion_pie': ('advanced_visuals', 'render_emotion_pie_chart'),
+}
+CHARTS = tuple(RENDERERS)
+
+
+def chart_inputs(df, cube, charts=CHARTS):
+    """The small precomputed input each chart is drawn from."""
+    from advanced_visuals import word_frequencies, emotion_heatmap_data, emotion_pie_data
+    from emotion_trend import emotion_trend_data
+    builders = {
+        'emotion_trend': lambda: emotion_trend_data(df, cube=cube),
+        'wordcloud': lambda: word_frequencies(df),
+        'emotion_heatmap': lambda: emotion_heatmap_data(cube),
+        'emotion_pie': lambda: emotion_pie_data(cube),
+    }
+    return {name: builders[name]() for name in charts}
+
+
+def input_digest(name, data):
+    h = hashlib.sha1(f"{RENDERER_VERSION}:{name}".encode())
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        h.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+        h.update(repr(list(data.columns) if isinstance(data, pd.DataFrame) else data.name).encode())
+    elif isinstance(data, dict):
+        h.update(repr(sorted(data.items())).encode())
+    else:
+        h.update(str(data).encode())
+    return h.hexdigest()[:16]
+
+
+def _render(name, data, outpath):
+    # renderers draw on bare Figures (no pyplot state), so this is safe on any
+    # thread; seaborn still imports pyplot, which must not pick a GUI backend
+    import matplotlib
+    matplotlib.use('Agg')
+    module, func = RENDERERS[name]
+    # unique per process and thread: concurrent sessions may draw the same chart
+    tmp = f"{outpath}.{os.getpid()}-{threading.get_ident()}.tmp.png"
+    getattr(importlib.import_module(module), func)(data, tmp)
+    os.replace(tmp, outpath)
+    return outpath
+
+
+def evict_charts(out_dir=CHART_DIR, keep=CHART_CACHE_FILES):
+    """Delete all but the `keep` most recently used PNGs in out_dir; returns how many were removed."""
+    try:
+        entries = [e for e in os.scandir(out_dir) if e.name.endswith('.png') and e.is_file()]
+    except FileNotFoundError:
+        return 0
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    removed = 0
+    for entry in entries[keep:]:
+        try:
+            os.remove(entry.path)
+            removed += 1
+        except FileNotFoundError:
+            pass  # another session evicted it first
+    return removed
+
+
+@stage('render_charts', rows=input_rows)
+def render_charts(df, cube=None, charts=CHARTS, out_dir=CHART_DIR, workers=1, keep=CHART_CACHE_FILES):
+    """
+    Return {chart name: PNG path}, drawing only charts whose input changed.
+    workers: process count for the missing charts; the default renders in
+    this process (a pool per call costs more than it saves for a handful of
+    charts), on bare matplotlib Figures, so concurrent calls from server
+    threads never share figure state. Pools use spawned workers, never fork, so this is safe to call
+    from a multi-threaded server. Afterwards out_dir keeps the `keep` most
+    recently used images.
+    """
+    cube = build_cube(df) if cube is None else cube
+    os.makedirs(out_dir, exist_ok=True)
+    paths, todo = {}, []
+    for name, data in chart_inputs(df, cube, charts).items():
+        path = os.path.join(out_dir, f"{name}-{input_digest(name, data)}.png")
+        paths[name] = path
+        try:
+            os.utime(path)  # a cache hit counts as a use for eviction
+        except FileNotFoundError:
+            todo.append((name, data, path))
+
+    note(cache_hits=len(paths) - len(todo), cache_misses=len(todo))
+    workers = min(workers or 1, len(todo))
+    if workers <= 1:
+        for job in todo:
+            _render(*job)
+    else:
+        from job_pool import SpawnPool
+        with SpawnPool(workers) as pool:
+            list(pool.map(_render, *zip(*todo)))
+    if todo:
+        evict_charts(out_dir, keep)
+    return paths
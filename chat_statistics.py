@@ -1,32 +1,38 @@
-import pandas as pd
-import plotly.express as px
+from aggregate_cube import DAYS, build_cube, cube_counts, cube_pivot
 
-def get_chat_stats(df):
+# Each helper reads from the aggregate cube; pass `cube` to reuse one built earlier.
+# plotly is imported by the plot_* helpers themselves, on first use.
+
+def get_chat_stats(df, cube=None):
+    cube = build_cube(df) if cube is None else cube
+    emotions = cube_counts(cube, 'emotion')
     stats = {}
-    stats['total_messages'] = int(len(df))
-    stats['active_days'] = int(df['timestamp'].dt.date.nunique() if not df['timestamp'].isna().all() else 0)
-    stats['unique_senders'] = int(df['sender'].nunique())
-    stats['unique_emotions'] = int(df['emotion'].nunique())
-    stats['top_emotion'] = df['emotion'].mode().iloc[0] if not df['emotion'].mode().empty else 'neutral'
+    stats['total_messages'] = int(cube['count'].sum())
+    stats['active_days'] = int(cube['date'].nunique())
+    stats['unique_senders'] = int(cube['sender'].nunique())
+    stats['unique_emotions'] = int(len(emotions))
+    stats['top_emotion'] = emotions.idxmax() if not emotions.empty else 'neutral'
     return stats
 
-def plot_emotion_distribution(df):
-    fig = px.pie(df, names='emotion', title='Emotion Distribution', hole=0.4)
+def plot_emotion_distribution(df, cube=None):
+    import plotly.express as px
+    cube = build_cube(df) if cube is None else cube
+    counts = cube_counts(cube, 'emotion').reset_index()
+    fig = px.pie(counts, names='emotion', values='count', title='Emotion Distribution', hole=0.4)
     return fig
 
-def plot_top_users(df):
-    counts = df['sender'].value_counts().nlargest(10).reset_index()
+def plot_top_users(df, cube=None):
+    import plotly.express as px
+    cube = build_cube(df) if cube is None else cube
+    counts = cube_counts(cube, 'sender').nlargest(10).reset_index()
     counts.columns = ['sender','count']
     fig = px.bar(counts, x='sender', y='count', title='Top Active Users')
     return fig
 
-def plot_message_heatmap_plotly(df):
-    df2 = df.copy()
-    df2['day'] = pd.to_datetime(df2['timestamp']).dt.day_name()
-    df2['hour'] = pd.to_datetime(df2['timestamp']).dt.hour
-    heat = df2.groupby(['day','hour']).size().reset_index(name='count')
-    heat_pivot = heat.pivot(index='day', columns='hour', values='count').fillna(0)
-    days = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
-    heat_pivot = heat_pivot.reindex(days).fillna(0)
+def plot_message_heatmap_plotly(df, cube=None):
+    import plotly.express as px
+    cube = build_cube(df) if cube is None else cube
+    heat_pivot = cube_pivot(cube, 'weekday', 'hour')
+    heat_pivot = heat_pivot.reindex(DAYS).fillna(0)
     fig = px.imshow(heat_pivot, labels=dict(x='Hour', y='Day', color='Messages'), title='Activity Heatmap (Day vs Hour)')
     return fig
@@ -0,0 +1,81 @@
+# Columnar persistence for analyzed chats (Parquet via pyarrow).
+# sender/emotion are dictionary-encoded and rows are written in timestamp order
+# with bounded row groups, so per-row-group min/max statistics let readers skip
+# everything outside a requested time range.
+import os
+from datetime import timedelta
+
+import pandas as pd
+
+from instrumentation import input_rows, output_rows, stage
+
+STORE_DIR = os.environ.get("ANALYSIS_STORE", os.path.join(".cache", "analyses"))
+COLUMNS = ['timestamp', 'sender', 'message', 'emotion']
+ROW_GROUP_SIZE = 64_000
+
+
+def analysis_path(name, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"{name}.parquet")
+
+
+def list_analyses(store_dir=STORE_DIR):
+    """Saved analyses as {name: path}, newest first."""
+    if not os.path.isdir(store_dir):
+        return {}
+    paths = [os.path.join(store_dir, f) for f in os.listdir(store_dir) if f.endswith('.parquet')]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    return {os.path.basename(p)[:-len('.parquet')]: p for p in paths}
+
+
+@stage('save_parquet', rows=input_rows)
+def save_analysis(df, path):
+    """Write an analyzed chat (timestamp, sender, message, emotion) to Parquet."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = df[[c for c in COLUMNS if c in df.columns]].sort_values('timestamp', kind='stable')
+    df = df.astype({c: 'category' for c in ('sender', 'emotion') if c in df.columns})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE, compression='zstd')
+    os.replace(tmp, path)
+    return path
+
+
+def _max_timestamp(path):
+    # from row-group statistics only, without reading any data pages
+    import pyarrow.parquet as pq
+    meta = pq.ParquetFile(path).metadata
+    col = meta.schema.names.index('timestamp')
+    stats = [meta.row_group(i).column(col).statistics for i in range(meta.num_row_groups)]
+    maxima = [s.max for s in stats if s is not None and s.has_min_max]
+    return pd.Timestamp(max(maxima)) if maxima else None
+
+
+@stage('load_parquet', rows=output_rows)
+def load_analysis(path, sender=None, since=None, until=None, last_days=None, columns=None):
+    """
+    Memory-map a saved analysis and read only the matching rows/columns.
+    sender: one name or a list of names; since/until: timestamps;
+    last_days: keep the last N days of the chat (relative to its newest message).
+    Filters are pushed down to Parquet, so skipped row groups are never decoded.
+    """
+    import pyarrow.parquet as pq
+
+    filters = []
+    if sender is not None:
+        senders = [sender] if isinstance(sender, str) else list(sender)
+        filters.append(('sender', 'in', senders))
+    if last_days is not None:
+        newest = _max_timestamp(path)
+        if newest is not None:
+            since = max(pd.Timestamp(since), newest - timedelta(days=last_days)) if since else newest - timedelta(days=last_days)
+    if since is not None:
+        filters.append(('timestamp', '>=', pd.Timestamp(since)))
+    if until is not None:
+        filters.append(('timestamp', '<=', pd.Timestamp(until)))
+
+    table = pq.read_table(path, columns=columns, filters=filters or None, memory_map=True)
+    return table.to_pandas()
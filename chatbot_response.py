@@ -11,29 +11,19 @@ fallback_responses = [
     "It’s okay to feel this way. Let’s work through it together."
 ]
 
-def generate_response(user_input, emotion=None, history=None):
-    """
-    Generate a chatbot response with optional emotion & conversation history.
-    Works entirely offline.
-
-    Args:
-        user_input (str): The user's message.
-        emotion (str): Emotion detected from analysis (optional).
-        history (list): Conversation history as list of tuples (user, bot).
-    """
-
-    # Build conversation context
-    conversation_context = ""
+def build_context(user_input, emotion=None, history=None, turns=5):
+    """Prompt text for model backends: the last `turns` exchanges, the detected emotion and the new message."""
+    lines = []
     if history:
-        for u, r in history[-5:]:  # last 5 exchanges
-            conversation_context += f"User: {u}\nBot: {r}\n"
-
+        for u, r in list(history)[-turns:]:
+            lines.append(f"User: {u}\nBot: {r}\n")
     if emotion:
-        conversation_context += f"(User seems to be feeling {emotion}.)\n"
+        lines.append(f"(User seems to be feeling {emotion}.)\n")
+    lines.append(f"User: {user_input}\nBot:")
+    return ''.join(lines)
 
-    conversation_context += f"User: {user_input}\nBot:"
-
-    # Simple offline logic — pattern based (can be extended)
+def rule_based_response(user_input):
+    """Offline pattern-based reply; also the fallback when a model misses its latency budget."""
     lower_input = user_input.lower()
 
     if any(word in lower_input for word in ["sad", "unhappy", "depressed"]):
@@ -45,3 +35,17 @@ def generate_response(user_input, emotion=None, history=None):
     
     # If no rule matches, pick a random supportive message
     return random.choice(fallback_responses)
+
+def generate_response(user_input, emotion=None, history=None):
+    """
+    Generate a chatbot response with optional emotion & conversation history.
+    Works entirely offline.
+
+    Args:
+        user_input (str): The user's message.
+        emotion (str): Emotion detected from analysis (optional).
+        history (list): Conversation history as list of tuples (user, bot).
+    The rule-based replies only look at the message; model backends that use
+    emotion and history build their prompt with build_context (see chatbot_service).
+    """
+    return rule_based_response(user_input)
@@ -0,0 +1,195 @@
+# Asyncio chatbot service for many concurrent chat sessions in one process.
+# Requests go through one queue; a batcher collects up to `max_batch` of them
+# (waiting at most `max_wait_ms` after the first) and hands the whole batch to
+# the backend. Each request has a latency budget: when the backend misses it
+# (or fails), the caller gets the rule-based reply instead. Per-session history
+# is a fixed-size ring buffer, and idle sessions are evicted LRU-first.
+import asyncio
+import inspect
+import os
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from chatbot_response import build_context, rule_based_response
+
+MAX_BATCH = 16
+MAX_WAIT_MS = 10
+BUDGET_MS = 800
+HISTORY_TURNS = 5
+MAX_SESSIONS = 10_000
+
+
+@dataclass
+class ChatRequest:
+    session_id: str
+    text: str
+    emotion: str = None
+    prompt: str = ''
+    future: asyncio.Future = field(default=None, repr=False)
+
+
+class RuleBasedBackend:
+    """The offline pattern replies, batched trivially."""
+
+    def generate_batch(self, requests):
+        return [rule_based_response(r.text) for r in requests]
+
+
+class LocalModelBackend:
+    """
+    A local Hugging Face text2text model (default: flan-t5-small), one padded
+    forward pass per batch. Requires: transformers, torch
+    """
+
+    def __init__(self, model_name="google/flan-t5-small", max_new_tokens=64):
+        self.model_name = model_name
+        self.max_new_tokens = max_new_tokens
+        self._pipe = None
+
+    def generate_batch(self, requests):
+        if self._pipe is None:
+            from transformers import pipeline
+            self._pipe = pipeline("text2text-generation", model=self.model_name)
+        outputs = self._pipe([r.prompt for r in requests], batch_size=len(requests),
+                             max_new_tokens=self.max_new_tokens)
+        return [o['generated_text'].strip() or rule_based_response(r.text) for o, r in zip(outputs, requests)]
+
+
+def backend_from_env(spec=None):
+    """CHATBOT_BACKEND: 'rules' (default) or 'local[:model name]'."""
+    spec = spec or os.environ.get("CHATBOT_BACKEND", "rules")
+    name, _, arg = spec.partition(':')
+    if name == 'local':
+        return LocalModelBackend(arg) if arg else LocalModelBackend()
+    return RuleBasedBackend()
+
+
+class ChatbotService:
+    """
+    Micro-batching chat service.
+
+        service = ChatbotService(backend)
+        await service.start()
+        reply = await service.respond('session-1', 'I feel low', emotion='sad')
+        await service.stop()
+
+    Backends implement generate_batch(list[ChatRequest]) -> list[str], either as
+    a coroutine or as a plain function (run on a worker thread).
+    """
+
+    def __init__(self, backend=None, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, budget_ms=BUDGET_MS,
+                 history_turns=HISTORY_TURNS, max_sessions=MAX_SESSIONS):
+        self.backend = backend or RuleBasedBackend()
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.budget_ms = budget_ms
+        self.history_turns = history_turns
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()  # session id -> deque of (user, bot), LRU order
+        self.stats = {'requests': 0, 'fallbacks': 0, 'errors': 0, 'batches': 0, 'batched_requests': 0}
+        self._queue = None
+        self._worker = None
+
+    def history(self, session_id):
+        """The session's ring buffer of the last `history_turns` exchanges."""
+        buf = self.sessions.get(session_id)
+        if buf is None:
+            buf = self.sessions[session_id] = deque(maxlen=self.history_turns)
+            if len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(session_id)
+        return buf
+
+    async def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._batcher())
+        return self
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def respond(self, session_id, text, emotion=None, budget_ms=None):
+        """Reply to one message within `budget_ms`, falling back to the rule-based reply."""
+        await self.start()
+        history = self.history(session_id)
+        req = ChatRequest(session_id, text, emotion, build_context(text, emotion, history, self.history_turns),
+                          asyncio.get_running_loop().create_future())
+        self.stats['requests'] += 1
+        await self._queue.put(req)
+        budget = (budget_ms if budget_ms is not None else self.budget_ms) / 1000
+        try:
+            reply = await asyncio.wait_for(asyncio.shield(req.future), budget)
+        except Exception:
+            # over budget or the backend failed: answer now; the batcher skips cancelled requests
+            req.future.cancel()
+            self.stats['fallbacks'] += 1
+            reply = rule_based_response(text)
+        history.append((text, reply))
+        return reply
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return [r for r in batch if not r.future.done()]
+
+    async def _batcher(self):
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            self.stats['batches'] += 1
+            self.stats['batched_requests'] += len(batch)
+            try:
+                if inspect.iscoroutinefunction(self.backend.generate_batch):
+                    replies = await self.backend.generate_batch(batch)
+                else:
+                    replies = await asyncio.to_thread(self.backend.generate_batch, batch)
+            except Exception as e:
+                self.stats['errors'] += 1
+                for r in batch:
+                    if not r.future.done():
+                        r.future.set_exception(e)
+                continue
+            for r, reply in zip(batch, replies):
+                if not r.future.done():
+                    r.future.set_result(reply)
+
+
+class ThreadedChatbot:
+    """
+    Runs a ChatbotService on its own event loop thread so synchronous callers
+    (Streamlit reruns, one thread per session) share one batching service.
+    """
+
+    def __init__(self, service=None):
+        self.service = service or ChatbotService(backend_from_env())
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True, name="chatbot-service").start()
+        asyncio.run_coroutine_threadsafe(self.service.start(), self.loop).result()
+
+    def ask(self, session_id, text, emotion=None, budget_ms=None):
+        budget = budget_ms if budget_ms is not None else self.service.budget_ms
+        future = asyncio.run_coroutine_threadsafe(
+            self.service.respond(session_id, text, emotion, budget_ms), self.loop)
+        # respond() enforces the budget itself; the margin only guards a stuck loop
+        return future.result(timeout=budget / 1000 + 5)
+
+    def history(self, session_id):
+        return list(self.service.sessions.get(session_id, ()))
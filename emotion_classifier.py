@@ -1,5 +1,11 @@
 # Lightweight emotion detection using TextBlob + keyword heuristics
-from textblob import TextBlob
+import hashlib
+import os
+import re
+from functools import lru_cache, partial
+from keyword_matcher import KeywordMatcher
+from label_cache import cached_labels
+from instrumentation import output_rows, stage
 
 KEYMAP = {
     'sad': ['sad','depress','unhappy','lonely','cry','hopeless','down'],
@@ -8,27 +14,93 @@ KEYMAP = {
     'stressed': ['stress','anxious','anxiety','worried','overwhelm','panic'],
     'neutral': []
 }
+# bump when the classification logic changes; lexicon edits change it automatically
+CLASSIFIER_VERSION = '1-' + hashlib.sha1(repr(KEYMAP).encode()).hexdigest()[:10]
+# built once; first label in KEYMAP order wins, as with the original nested loop
+MATCHER = KeywordMatcher(KEYMAP)
+# below this many distinct messages, pool startup costs more than it saves
+PARALLEL_MIN_TEXTS = 20_000
+
+@lru_cache(maxsize=None)
+def _polarity_screen():
+    # pattern_sentiment is the lexicon scorer behind TextBlob(text).sentiment, without building a TextBlob per message.
+    # pattern only scores lexicon words and emoticons, so a text containing neither has polarity 0
+    # (textblob is imported here, on first use, not when the module loads)
+    from textblob.en import sentiment as pattern_sentiment
+    from textblob._text import EMOTICONS
+    words = KeywordMatcher({'scored': list(pattern_sentiment.keys())})
+    # the tokenizer may split an emoticon with single spaces before rejoining it
+    faces = sorted({e for group in EMOTICONS.values() for e in group}, key=len, reverse=True)
+    emoticons = re.compile('|'.join(' ?'.join(map(re.escape, e)) for e in faces), re.IGNORECASE)
+    return words, emoticons, pattern_sentiment
+
+def polarity_labels(texts):
+    """Polarity fallback for texts without keyword hits: happy / sad / neutral."""
+    words, emoticons, pattern_sentiment = _polarity_screen()
+    labels = []
+    for text in texts:
+        label = 'neutral'
+        if words.first_label(text) or emoticons.search(' '.join(text.split())):
+            try:
+                polarity = pattern_sentiment(text)[0]
+                if polarity > 0.25:
+                    label = 'happy'
+                elif polarity < -0.25:
+                    label = 'sad'
+            except Exception:
+                pass
+        labels.append(label)
+    return labels
 
 def _classify_text(text):
-    if not text or not isinstance(text, str):
-        return 'neutral'
-    lower = text.lower()
-    for label, words in KEYMAP.items():
-        for w in words:
-            if w in lower:
-                return label
-    # fallback to polarity
-    try:
-        polarity = TextBlob(text).sentiment.polarity
-        if polarity > 0.25:
-            return 'happy'
-        if polarity < -0.25:
-            return 'sad'
-    except Exception:
-        pass
-    return 'neutral'
-
-def get_emotions(df):
-    df = df.copy()
-    df['emotion'] = df['message'].fillna('').apply(_classify_text)
-    return df
+    return _classify_many([text])[0]
+
+def _classify_many(texts):
+    """
+    Two-stage labelling: keyword hits first, then the polarity scorer only
+    for the distinct texts that no keyword resolved.
+    """
+    labels = [MATCHER.first_label(t) if t and isinstance(t, str) else 'neutral' for t in texts]
+    unresolved = list(dict.fromkeys(t for t, label in zip(texts, labels) if label is None))
+    if unresolved:
+        fallback = dict(zip(unresolved, polarity_labels(unresolved)))
+        labels = [fallback[t] if label is None else label for t, label in zip(texts, labels)]
+    return labels
+
+def _resolve_workers(workers):
+    # None -> EMOTION_WORKERS env var (default 1 = serial), 0 -> all cores
+    if workers is None:
+        workers = int(os.environ.get('EMOTION_WORKERS', 1))
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+def _classify_parallel(texts, workers=1):
+    """
+    Shard distinct texts across a process pool. pool.map returns shards in
+    submission order, so labels line up with `texts` deterministically.
+    Small inputs stay serial. Workers are spawned, not forked, since this
+    may run inside the multi-threaded Streamlit server.
+    """
+    if workers <= 1 or len(texts) < PARALLEL_MIN_TEXTS:
+        return _classify_many(texts)
+    from job_pool import SpawnPool
+    size = -(-len(texts) // (workers * 4))
+    shards = [texts[i:i + size] for i in range(0, len(texts), size)]
+    with SpawnPool(workers) as pool:
+        return [label for part in pool.map(_classify_many, shards) for label in part]
+
+@stage('get_emotions', rows=output_rows)
+def get_emotions(df, use_cache=True, workers=None):
+    import pandas as pd
+    messages = df['message'].fillna('')
+    classify = partial(_classify_parallel, workers=_resolve_workers(workers))
+    if use_cache:
+        emotions = cached_labels(messages.tolist(), 'keyword', CLASSIFIER_VERSION, classify)
+    else:
+        unique = list(messages.unique())
+        emotions = messages.map(dict(zip(unique, classify(unique))))
+    # assign() shares the other columns with the input instead of deep-copying them
+    out = df.assign(emotion=pd.Categorical(emotions))
+    out.attrs['classifier'] = f"keyword:{CLASSIFIER_VERSION}"  # which labels these are (incremental.py)
+    return out
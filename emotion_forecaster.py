@@ -1,5 +1,217 @@
-def forecast_emotions(df):
-    if df.empty:
-        return 'neutral'
-    recent = df.tail(50)
-    return recent['emotion'].mode().iloc[0] if not recent['emotion'].mode().empty else 'neutral'
+# Stateful emotion forecaster for live chats.
+# Keeps exponentially decayed emotion counts per sender (and chat-wide) plus
+# decayed transition counts between a sender's consecutive emotions, all in
+# small numpy arrays. Each message is an O(1) update (a handful of row
+# operations over the emotion vocabulary); forecasts read the arrays without
+# rescanning history, and the state saves to / loads from one .npz file.
+import io
+import json
+import math
+import os
+
+import numpy as np
+
+HALF_LIFE_HOURS = 24.0
+MARKOV_WEIGHT = 0.5  # share of the forecast taken from the transition model
+
+
+def _seconds(timestamp):
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, (int, float, np.integer, np.floating)):
+        return float(timestamp)
+    import pandas as pd
+    timestamp = pd.Timestamp(timestamp)
+    return None if pd.isna(timestamp) else timestamp.timestamp()
+
+
+class EmotionForecaster:
+    """
+    Decayed per-sender emotion counts + a Markov next-emotion model.
+
+        f = EmotionForecaster(half_life_hours=24)
+        f.update('Priya', 'sad', '2024-01-01 10:00')
+        f.forecast('Priya')            # -> most likely next emotion
+        f.distribution('Priya')        # -> {emotion: probability}
+
+    Counts halve every `half_life_hours` of chat time. Messages without a
+    timestamp are counted at the latest time seen; before any timed message
+    nothing decays.
+    """
+
+    def __init__(self, half_life_hours=HALF_LIFE_HOURS, markov_weight=MARKOV_WEIGHT):
+        self.half_life_hours = half_life_hours
+        self.markov_weight = markov_weight
+        self._rate = math.log(2) / (half_life_hours * 3600.0)
+        self.labels, self._label_idx = [], {}
+        self.senders, self._sender_idx = [], {}
+        self.now = None          # latest message time (epoch seconds)
+        self.n_messages = 0
+        self.counts = np.zeros((0, 0))          # sender x emotion
+        self.sender_time = np.zeros(0)          # when each sender row was last decayed (NaN: never timed)
+        self.sender_last = np.zeros(0, dtype=np.int32)  # each sender's last emotion (-1: none)
+        self.totals = np.zeros(0)               # chat-wide emotion counts
+        self.transitions = np.zeros((0, 0))     # previous x next emotion
+        self.last_emotion = -1                  # last emotion in the chat
+        self._shared_time = None                # when totals/transitions were last decayed
+
+    # --- vocabulary growth (amortised O(1): arrays grow by doubling) ---
+    def _label(self, emotion):
+        idx = self._label_idx.get(emotion)
+        if idx is None:
+            idx = self._label_idx[emotion] = len(self.labels)
+            self.labels.append(emotion)
+            if idx >= self.totals.shape[0]:
+                k = max(8, 2 * idx)
+                self.counts = np.pad(self.counts, ((0, 0), (0, k - self.counts.shape[1])))
+                self.totals = np.pad(self.totals, (0, k - self.totals.shape[0]))
+                self.transitions = np.pad(self.transitions, ((0, k - self.transitions.shape[0]),) * 2)
+        return idx
+
+    def _sender(self, sender):
+        idx = self._sender_idx.get(sender)
+        if idx is None:
+            idx = self._sender_idx[sender] = len(self.senders)
+            self.senders.append(sender)
+            if idx >= self.counts.shape[0]:
+                n = max(16, 2 * idx) - self.counts.shape[0]
+                self.counts = np.pad(self.counts, ((0, n), (0, 0)))
+                self.sender_time = np.pad(self.sender_time, (0, n), constant_values=np.nan)
+                self.sender_last = np.pad(self.sender_last, (0, n), constant_values=-1)
+            self.sender_time[idx] = self.now if self.now is not None else np.nan
+        return idx
+
+    def _decay(self, since, until):
+        # no decay until both ends are timed (NaN / None: untimed so far)
+        if since is None or until is None or since != since or until <= since:
+            return 1.0
+        return math.exp(-self._rate * (until - since))
+
+    # --- updates ---
+    def update(self, sender, emotion, timestamp=None):
+        """Add one message; O(number of emotions), independent of history length."""
+        t = _seconds(timestamp)
+        if t is None or (self.now is not None and t < self.now):
+            t = self.now  # untimed or out-of-order messages count at the latest time
+        self.now = t
+        e = self._label(emotion)
+        s = self._sender(sender)
+
+        self.counts[s] *= self._decay(self.sender_time[s], t)
+        self.counts[s, e] += 1.0
+        self.sender_time[s] = t if t is not None else np.nan
+
+        shared = self._decay(self._shared_time, t)
+        if shared != 1.0:
+            self.totals *= shared
+            self.transitions *= shared
+        self._shared_time = t
+        self.totals[e] += 1.0
+        prev = self.sender_last[s]
+        if prev >= 0:
+            self.transitions[prev, e] += 1.0
+        self.sender_last[s] = e
+        self.last_emotion = e
+        self.n_messages += 1
+        return self
+
+    def update_many(self, df, sender_col='sender', emotion_col='emotion', time_col='timestamp'):
+        """Feed a DataFrame of messages in chat order; without a sender column the chat is one sender."""
+        times = df[time_col].tolist() if time_col in df.columns else [None] * len(df)
+        senders = df[sender_col].tolist() if sender_col in df.columns else [None] * len(df)
+        for sender, emotion, ts in zip(senders, df[emotion_col].tolist(), times):
+            self.update(sender, emotion, ts)
+        return self
+
+    # --- queries ---
+    def _normalized(self, row):
+        row = row[:len(self.labels)]
+        total = row.sum()
+        return row / total if total > 0 else None
+
+    def distribution(self, sender=None):
+        """
+        Forecast distribution over emotions for the next message of `sender`
+        (or of the chat when None): a blend of the decayed emotion mix and the
+        transition row of the last emotion.
+        """
+        if not self.labels:
+            return {}
+        if sender is None:
+            mix, last = self._normalized(self.totals), self.last_emotion
+        else:
+            s = self._sender_idx.get(sender)
+            if s is None:
+                return self.distribution()
+            mix, last = self._normalized(self.counts[s]), self.sender_last[s]
+        markov = self._normalized(self.transitions[last]) if last >= 0 else None
+        if mix is None:
+            mix = markov
+        elif markov is not None:
+            mix = (1 - self.markov_weight) * mix + self.markov_weight * markov
+        if mix is None:
+            return {}
+        return dict(zip(self.labels, mix.tolist()))
+
+    def next_emotion_distribution(self, emotion):
+        """P(next emotion | current emotion) from the decayed transition counts."""
+        idx = self._label_idx.get(emotion)
+        probs = self._normalized(self.transitions[idx]) if idx is not None else None
+        return dict(zip(self.labels, probs.tolist())) if probs is not None else {}
+
+    def forecast(self, sender=None, default='neutral'):
+        dist = self.distribution(sender)
+        return max(dist, key=dist.get) if dist else default
+
+    # --- persistence ---
+    def to_bytes(self):
+        meta = {'half_life_hours': self.half_life_hours, 'markov_weight': self.markov_weight,
+                'labels': self.labels, 'senders': self.senders, 'now': self.now,
+                'n_messages': self.n_messages, 'last_emotion': int(self.last_emotion),
+                'shared_time': self._shared_time}
+        buf = io.BytesIO()
+        np.savez_compressed(buf, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+                            counts=self.counts, sender_time=self.sender_time,
+                            sender_last=self.sender_last, totals=self.totals,
+                            transitions=self.transitions)
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        arrays = np.load(io.BytesIO(data))
+        meta = json.loads(arrays['meta'].tobytes().decode())
+        f = cls(meta['half_life_hours'], meta['markov_weight'])
+        f.labels, f.senders = meta['labels'], meta['senders']
+        f._label_idx = {label: i for i, label in enumerate(f.labels)}
+        f._sender_idx = {sender: i for i, sender in enumerate(f.senders)}
+        f.now, f.n_messages = meta['now'], meta['n_messages']
+        f.last_emotion, f._shared_time = meta['last_emotion'], meta['shared_time']
+        for name in ('counts', 'sender_time', 'sender_last', 'totals', 'transitions'):
+            setattr(f, name, arrays[name])
+        return f
+
+    def save(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as fh:
+            fh.write(self.to_bytes())
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as fh:
+            return cls.from_bytes(fh.read())
+
+
+def forecast_emotions(df, sender=None, forecaster=None):
+    """
+    Most likely next emotion for the chat (or one sender).
+    Pass a `forecaster` already fed with the chat to answer without rescanning df.
+    """
+    if forecaster is None:
+        if df.empty:
+            return 'neutral'
+        forecaster = EmotionForecaster().update_many(df)
+    return forecaster.forecast(sender)
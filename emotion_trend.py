@@ -1,6 +1,4 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
 
 # --- Helper: Ensure Date and Emotion columns exist ---
 def ensure_date_emotion(df, date_col="Date", emotion_col="Emotion"):
@@ -38,37 +36,128 @@ def ensure_date_emotion(df, date_col="Date", emotion_col="Emotion"):
                     raise ValueError("❌ No Emotion or Sentiment column found or detected.")
 
     return df
+# --- Time-bucketed trend: bucket size picked from the chat's span and a point budget ---
+TREND_MAX_POINTS = 300  # buckets per emotion line, whatever the chat length
+# (label, resample rule, nominal bucket length); finest first
+BUCKETS = [
+    ('minute', 'min', pd.Timedelta(minutes=1)),
+    ('hour', 'h', pd.Timedelta(hours=1)),
+    ('day', 'D', pd.Timedelta(days=1)),
+    ('week', 'W-MON', pd.Timedelta(weeks=1)),
+    ('month', 'MS', pd.Timedelta(days=31)),
+    ('quarter', 'QS', pd.Timedelta(days=92)),
+    ('year', 'YS', pd.Timedelta(days=366)),
+]
+
+
+def choose_bucket(start, end, max_points=TREND_MAX_POINTS, finest='minute'):
+    """Finest bucket (not finer than `finest`) that keeps (end - start) within max_points buckets."""
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    labels = [b[0] for b in BUCKETS]
+    for label, _, length in BUCKETS[labels.index(finest):]:
+        if span / length < max_points:
+            return label
+    return BUCKETS[-1][0]
+
+
+def _minutes_wanted(df, cube, bucket, max_points):
+    # minute buckets (a chat spanning a few hours, or asked for) need the raw timestamps
+    if df is None or 'timestamp' not in df.columns or 'emotion' not in df.columns:
+        return False
+    if bucket not in (None, 'minute'):
+        return False
+    hours = cube['date'] + pd.to_timedelta(cube['hour'].fillna(0), unit='h')
+    return choose_bucket(hours.min(), hours.max() + pd.Timedelta(hours=1), max_points) == 'minute'
+
+
+def _trend_frame(df, date_col, emotion_col, cube, bucket=None, max_points=TREND_MAX_POINTS):
+    """Counts as a wide (time x emotion) frame at the finest resolution available, plus that resolution."""
+    if cube is not None and len(cube) and not _minutes_wanted(df, cube, bucket, max_points):
+        # the cube is hourly: date + hour
+        ts = cube['date'] + pd.to_timedelta(cube['hour'].fillna(0), unit='h')
+        wide = cube.assign(ts=ts).pivot_table(index='ts', columns='emotion', values='count',
+                                              aggfunc='sum', fill_value=0, observed=True)
+        return wide, 'hour'
+    if {'timestamp', 'emotion'} <= set(df.columns):
+        ts, emotion = df['timestamp'], df['emotion']
+    else:
+        legacy = ensure_date_emotion(df.copy(deep=False), date_col, emotion_col)
+        ts, emotion = legacy[date_col], legacy[emotion_col]
+    wide = emotion.groupby(ts.dt.floor('min'), observed=True).value_counts().unstack(fill_value=0)
+    return wide, 'minute'
+
+
+def emotion_trend_data(df, date_col="Date", emotion_col="Emotion", cube=None, bucket=None,
+                       max_points=TREND_MAX_POINTS, smooth=None):
+    """
+    Emotion counts per time bucket: a (bucket start x emotion) frame with at
+    most ~max_points rows. `bucket` asks for minute/hour/day/week/month/quarter/
+    year (coarsened if it would exceed max_points); by default it is chosen
+    from the chat's span. `smooth` applies a rolling mean over that many
+    buckets. The bucket label is in .attrs['bucket'].
+    """
+    wide, finest = _trend_frame(df, date_col, emotion_col, cube, bucket, max_points)
+    if wide.empty:
+        # named axes, so plot_emotion_trend_plotly's long frame still has date/emotion columns
+        out = pd.DataFrame(index=pd.DatetimeIndex([], name=date_col), columns=pd.Index([], dtype=str, name=emotion_col))
+        out.attrs['bucket'] = bucket or 'day'
+        return out
+    wide.index = pd.DatetimeIndex(wide.index)
+    labels = [b[0] for b in BUCKETS]
+    auto = choose_bucket(wide.index.min(), wide.index.max(), max_points, finest)
+    # never finer than the source, never more buckets than the budget
+    bucket = auto if bucket is None else labels[max(labels.index(bucket), labels.index(auto))]
+    rule = BUCKETS[labels.index(bucket)][1]
+    out = wide.resample(rule, label='left', closed='left').sum()  # weeks start on Monday
+    if smooth and smooth > 1:
+        out = out.rolling(smooth, min_periods=1).mean()
+    out.index.name = date_col
+    out.columns = out.columns.astype(str)
+    out.columns.name = emotion_col
+    out.attrs['bucket'] = bucket
+    return out
+
+
 # --- Plotly version for Streamlit ---
-def plot_emotion_trend_plotly(df, date_col="Date", emotion_col="Emotion"):
-    df = ensure_date_emotion(df, date_col, emotion_col)
+def plot_emotion_trend_plotly(df, date_col="Date", emotion_col="Emotion", cube=None, bucket=None,
+                              max_points=TREND_MAX_POINTS, smooth=None):
+    import plotly.express as px
+    trend = emotion_trend_data(df, date_col, emotion_col, cube, bucket, max_points, smooth)
+    long = trend.stack().rename("Count").reset_index()
     fig = px.line(
-        df.groupby([date_col, emotion_col]).size().reset_index(name="Count"),
+        long,
         x=date_col,
         y="Count",
         color=emotion_col,
-        markers=True,
-        title="Emotion Trend Over Time"
+        markers=len(trend) <= 60,
+        title=f"Emotion Trend Over Time (per {trend.attrs['bucket']})"
     )
     return fig
 
 
 # --- Matplotlib version for PNG saving ---
-def save_emotion_trend_png(df, date_col="Date", emotion_col="Emotion", output_file="emotion_trend.png"):
-    df = ensure_date_emotion(df, date_col, emotion_col)
+def render_emotion_trend_png(trend_df, output_file):
+    # a bare Figure, not pyplot: no global figure state shared with other threads
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    marker = 'o' if len(trend_df) <= 60 else None
+    for col in trend_df.columns:
+        ax.plot(trend_df.index, trend_df[col], marker=marker, label=col)
 
-    trend_df = df.groupby([date_col, emotion_col]).size().unstack(fill_value=0)
+    ax.set_title("Emotion Trend Over Time")
+    ax.set_xlabel(f"Date (per {trend_df.attrs.get('bucket', 'day')})")
+    ax.set_ylabel("Count")
+    if len(trend_df.columns):
+        ax.legend()
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    fig.savefig(output_file)
+    return output_file
 
-    plt.figure(figsize=(10, 6))
-    for col in trend_df.columns:
-        plt.plot(trend_df.index, trend_df[col], marker='o', label=col)
-
-    plt.title("Emotion Trend Over Time")
-    plt.xlabel("Date")
-    plt.ylabel("Count")
-    plt.legend()
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(output_file)
-    plt.close()
+
+def save_emotion_trend_png(df, date_col="Date", emotion_col="Emotion", output_file="emotion_trend.png", cube=None,
+                           bucket=None, smooth=None):
+    render_emotion_trend_png(emotion_trend_data(df, date_col, emotion_col, cube, bucket, smooth=smooth), output_file)
 
     print(f"✅ Emotion trend chart saved as '{output_file}'")
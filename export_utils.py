@@ -1,24 +1,90 @@
 import pandas as pd
 import os, zipfile, io
-from advanced_visuals import generate_wordcloud, generate_emotion_heatmap, generate_emotion_pie_chart
-def export_excel(df, out='outputs/chat_emotions.xlsx'):
-    os.makedirs('outputs', exist_ok=True)
-    df.to_excel(out, index=False)
+from aggregate_cube import build_cube, cube_counts
+from chart_renderer import render_charts
+from instrumentation import input_rows, stage
+
+EXCEL_MAX_ROWS = 1_048_576  # per sheet, including the header row
+EXCEL_CHUNK_ROWS = 50_000
+
+def _excel_values(chunk):
+    # openpyxl rejects NaT/NaN and control characters; convert a chunk at a time
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    text_cols = [c for c in chunk.columns
+                 if not (pd.api.types.is_numeric_dtype(chunk[c]) or pd.api.types.is_datetime64_any_dtype(chunk[c]))]
+    chunk = chunk.astype(object)
+    for col in text_cols:
+        chunk[col] = chunk[col].map(lambda v: ILLEGAL_CHARACTERS_RE.sub('', v) if isinstance(v, str) else v)
+    return chunk.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+@stage('excel_export', rows=input_rows)
+def export_excel_stream(df, out=None, cube=None, summary=True, chunksize=EXCEL_CHUNK_ROWS):
+    """
+    Write df to .xlsx with openpyxl's write-only workbook, converting and
+    appending `chunksize` rows at a time so memory stays bounded.
+    Rows beyond Excel's limit continue on Sheet2, Sheet3, ...; with `summary`
+    a Summary sheet lists emotion and sender counts from the aggregate cube.
+    `out` may be a path or a file-like object; None writes to a new BytesIO.
+    Returns `out` (or the BytesIO).
+    """
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    header = [str(c) for c in df.columns]
+    ws, sheet_rows, sheets = None, EXCEL_MAX_ROWS, 0
+    for start in range(0, len(df), chunksize):
+        for row in _excel_values(df.iloc[start:start + chunksize]):
+            if sheet_rows >= EXCEL_MAX_ROWS:
+                sheets += 1
+                ws = wb.create_sheet(f"Sheet{sheets}")
+                ws.append(header)
+                sheet_rows = 1
+            ws.append(row)
+            sheet_rows += 1
+    if ws is None:
+        wb.create_sheet("Sheet1").append(header)
+
+    if summary:
+        cube = build_cube(df) if cube is None else cube
+        ws = wb.create_sheet("Summary")
+        ws.append(['Emotion', 'Count'])
+        for emotion, count in cube_counts(cube, 'emotion').sort_values(ascending=False).items():
+            ws.append([str(emotion), int(count)])
+        ws.append([])
+        ws.append(['Sender', 'Messages'])
+        for sender, count in cube_counts(cube, 'sender').sort_values(ascending=False).items():
+            ws.append([str(sender), int(count)])
+
+    if out is None:
+        out = io.BytesIO()
+    elif isinstance(out, str) and os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    wb.save(out)
+    if hasattr(out, 'seek'):
+        out.seek(0)
     return out
 
-def export_png_bundle(df, outzip='outputs/chat_images.zip'):
-    os.makedirs('outputs', exist_ok=True)
-    paths = []
-    paths.append(generate_wordcloud(df))
-    paths.append(generate_emotion_heatmap(df))
-    paths.append(generate_emotion_pie_chart(df))
+def export_excel(df, out='outputs/chat_emotions.xlsx'):
+    return export_excel_stream(df, out, summary=False)
+
+def export_png_bundle(df, outzip='outputs/chat_images.zip', cube=None, charts=None):
+    """
+    Zip the static charts; pass `charts` (render_charts output) to reuse images already drawn.
+    `outzip` may be a path or a file-like object; None writes to a new BytesIO.
+    """
+    if outzip is None:
+        outzip = io.BytesIO()
+    elif isinstance(outzip, str) and os.path.dirname(outzip):
+        os.makedirs(os.path.dirname(outzip), exist_ok=True)
+    charts = render_charts(df, cube) if charts is None else charts
     # create zip
     with zipfile.ZipFile(outzip, 'w') as zf:
-        for p in paths:
+        for name, p in charts.items():
             if os.path.exists(p):
-                zf.write(p, arcname=os.path.basename(p))
+                zf.write(p, arcname=f"{name}.png")
+    if hasattr(outzip, 'seek'):
+        outzip.seek(0)
     return outzip
 
 # compatibility function used earlier
-def make_zip_bundle(df):
-    return export_png_bundle(df)
+def make_zip_bundle(df, cube=None, charts=None):
+    return export_png_bundle(df, cube=cube, charts=charts)
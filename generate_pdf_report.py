@@ -1,11 +1,25 @@
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
+import io
 import os
+from aggregate_cube import build_cube, cube_counts
+from chart_renderer import render_charts
+from instrumentation import input_rows, stage
 
-def generate_pdf_report(df, outpath='outputs/mental_health_report.pdf'):
-    os.makedirs(os.path.dirname(outpath), exist_ok=True)
+@stage('pdf_report', rows=input_rows)
+def generate_pdf_report(df, outpath='outputs/mental_health_report.pdf', cube=None, charts=None):
+    """
+    Build the PDF; pass `charts` (render_charts output) to embed images already drawn for the PNG bundle.
+    `outpath` may be a path or a file-like object; None writes to a new BytesIO.
+    """
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib import colors
+    cube = build_cube(df) if cube is None else cube
+    charts = render_charts(df, cube, charts=('emotion_trend', 'wordcloud', 'emotion_heatmap')) if charts is None else charts
+    if outpath is None:
+        outpath = io.BytesIO()
+    elif isinstance(outpath, str) and os.path.dirname(outpath):
+        os.makedirs(os.path.dirname(outpath), exist_ok=True)
     styles = getSampleStyleSheet()
     doc = SimpleDocTemplate(outpath, pagesize=A4)
     elems = []
@@ -13,9 +27,9 @@ def generate_pdf_report(df, outpath='outputs/mental_health_report.pdf'):
     elems.append(Paragraph('Mental Health Chat Analysis', styles['Title']))
     elems.append(Spacer(1,12))
 
-    total = len(df)
-    unique_senders = df['sender'].nunique()
-    emotions = df['emotion'].value_counts().to_dict()
+    total = int(cube['count'].sum())
+    unique_senders = cube['sender'].nunique()
+    emotions = cube_counts(cube, 'emotion').sort_values(ascending=False).to_dict()
 
     elems.append(Paragraph(f'Total messages: {total}', styles['Normal']))
     elems.append(Paragraph(f'Unique senders: {unique_senders}', styles['Normal']))
@@ -30,12 +44,14 @@ def generate_pdf_report(df, outpath='outputs/mental_health_report.pdf'):
     elems.append(t)
     elems.append(Spacer(1,12))
 
-    imgs = ['outputs/emotion_trend.png','outputs/wordcloud.png','outputs/emotion_heatmap.png']
-    for im in imgs:
-        if os.path.exists(im):
-            elems.append(Paragraph(os.path.basename(im), styles['Heading3']))
+    for name in ['emotion_trend','wordcloud','emotion_heatmap']:
+        im = charts.get(name)
+        if im and os.path.exists(im):
+            elems.append(Paragraph(f'{name}.png', styles['Heading3']))
             elems.append(Image(im, width=400, height=200))
             elems.append(Spacer(1,12))
 
     doc.build(elems)
+    if hasattr(outpath, 'seek'):
+        outpath.seek(0)
     return outpath
@@ -0,0 +1,133 @@
+# Incremental re-analysis of appended WhatsApp exports.
+# A weekly export is the previous one plus new messages, so we fingerprint the
+# already-processed prefix and only translate/classify the new tail; each run
+# that adds messages writes only those messages as a new batch file.
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from instrumentation import stage
+
+STORE_DIR = os.environ.get("INCREMENTAL_STORE", os.path.join(".cache", "incremental"))
+KEY_COLUMNS = ['timestamp', 'sender', 'message']
+
+
+def prefix_fingerprint(df, n):
+    """Digest of the first n parsed messages (vectorized row hashes folded with sha256)."""
+    hashes = pd.util.hash_pandas_object(df[KEY_COLUMNS].iloc[:n], index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+
+def chat_key(df, settings=''):
+    # the first message identifies the chat; settings change the processed output
+    first = '\0'.join(str(v) for v in df[KEY_COLUMNS].iloc[0])
+    return hashlib.sha1(f"{first}\0{settings}".encode()).hexdigest()
+
+
+def emotion_aggregates(df):
+    """Per-day, per-hour and per-sender emotion counts as Series indexed by (bucket, emotion)."""
+    ts = pd.to_datetime(df['timestamp'])
+    return {
+        'day': df.groupby([ts.dt.date.rename('date'), 'emotion']).size(),
+        'hour': df.groupby([ts.dt.hour.rename('hour'), 'emotion']).size(),
+        'sender': df.groupby(['sender', 'emotion']).size(),
+    }
+
+
+def merge_aggregates(old, new):
+    return {k: old[k].add(new[k], fill_value=0).astype('int64') for k in old}
+
+
+def _load(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _dump(obj, path):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def _family(classifier):
+    return classifier.split(':', 1)[0]
+
+
+def _load_batches(chat_dir, batches):
+    frames = [_load(os.path.join(chat_dir, name)) for name in batches]
+    if any(f is None for f in frames):
+        return None
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    df.attrs = dict(frames[0].attrs)
+    return df
+
+
+@stage('incremental', rows=lambda result, *args, **kwargs: result[2])
+def analyze_incremental(raw_df, process_fn, settings='', classifier='', store_dir=STORE_DIR):
+    """
+    Run `process_fn` (translate + classify, row-preserving) only on messages
+    that were not seen in an earlier upload of the same chat.
+
+    raw_df is the parsed chat (clean_chat output, before translation).
+    `classifier` is the classifier asked for ('keyword' or 'transformer');
+    results are stored under the one that actually ran (the classified
+    frame's attrs['classifier']), so fallback labels are never reused as
+    another classifier's. Each chat has a directory holding one pickled
+    batch per run that added messages, plus a small state file (aggregates,
+    batch list, fingerprint + last timestamp of the raw prefix). If the new
+    upload starts with exactly that prefix only the tail is processed and
+    written as a new batch; otherwise the whole chat is processed again.
+    Returns (processed_df, aggregates, n_new).
+    """
+    if raw_df.empty:
+        df = process_fn(raw_df)
+        return df, emotion_aggregates(df), 0
+
+    chat_dir = os.path.join(store_dir, chat_key(raw_df, (settings, classifier)))
+    state = _load(os.path.join(chat_dir, 'state.pkl'))
+    n = state['n'] if state else 0
+    if (state and 0 < n <= len(raw_df)
+            and raw_df['timestamp'].iloc[n - 1] == state['last_timestamp']
+            and prefix_fingerprint(raw_df, n) == state['fingerprint']):
+        old = _load_batches(chat_dir, state['batches'])
+        tail = raw_df.iloc[n:]
+        if old is not None and tail.empty:
+            return old, state['aggregates'], 0
+        if old is not None:
+            new = process_fn(tail)
+            # same classifier (and version) as the stored labels: append
+            if new.attrs.get('classifier', classifier) == state['classifier']:
+                df = pd.concat([old, new], ignore_index=True)
+                df.attrs = dict(old.attrs)
+                aggregates = merge_aggregates(state['aggregates'], emotion_aggregates(new))
+                fingerprint = prefix_fingerprint(raw_df, len(raw_df))
+                name = f"batch-{n}-{fingerprint[:12]}.pkl"
+                _dump(new.reset_index(drop=True), os.path.join(chat_dir, name))
+                _dump({**state, 'n': len(raw_df), 'last_timestamp': raw_df['timestamp'].iloc[-1],
+                       'fingerprint': fingerprint, 'aggregates': aggregates,
+                       'batches': state['batches'] + [name]}, os.path.join(chat_dir, 'state.pkl'))
+                return df, aggregates, len(new)
+
+    new = df = process_fn(raw_df).reset_index(drop=True)
+    aggregates = emotion_aggregates(df)
+    used = df.attrs.get('classifier', classifier)
+    # a fallback classifier's labels go under its own key
+    chat_dir = os.path.join(store_dir, chat_key(raw_df, (settings, _family(used))))
+    os.makedirs(chat_dir, exist_ok=True)
+    fingerprint = prefix_fingerprint(raw_df, len(raw_df))
+    name = f"batch-0-{fingerprint[:12]}.pkl"
+    _dump(df, os.path.join(chat_dir, name))
+    _dump({'n': len(raw_df), 'last_timestamp': raw_df['timestamp'].iloc[-1], 'fingerprint': fingerprint,
+           'aggregates': aggregates, 'classifier': used, 'batches': [name]}, os.path.join(chat_dir, 'state.pkl'))
+    for stale in os.listdir(chat_dir):
+        if stale.startswith('batch-') and stale != name:
+            os.remove(os.path.join(chat_dir, stale))
+    return df, aggregates, len(new)
@@ -0,0 +1,165 @@
+# Lightweight per-stage instrumentation for the analyzer pipeline.
+# `stage` works as a decorator or a context manager and records wall time, rows,
+# cache hits/misses and the RSS change of one pipeline step. Records go to the
+# innermost `collect()` block (e.g. one Streamlit run), to process-wide totals
+# exposed in Prometheus text format, and to the `chat_analyzer.perf` logger as
+# one JSON line per stage. Cost per stage is two clock reads and two RSS reads.
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("chat_analyzer.perf")
+
+_open = contextvars.ContextVar("perf_open_stages", default=())
+_sink = contextvars.ContextVar("perf_sink", default=None)
+_totals = {}
+_lock = threading.Lock()
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes():
+    """Current resident set size (Linux /proc), else None."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def output_rows(result, *args, **kwargs):
+    return len(result)
+
+
+def input_rows(result, *args, **kwargs):
+    return len(args[0])
+
+
+class stage:
+    """
+    Time one pipeline step.
+
+        @stage('clean_chat', rows=output_rows)
+        def clean_chat(file): ...
+
+        with stage('translate') as rec:
+            ...
+            rec['rows'] = len(df)
+
+    `rows` is a callable (result, *args, **kwargs) -> int when decorating.
+    """
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        parents = _open.get()
+        self.record = {'stage': self.name, 'parent': parents[-1]['stage'] if parents else None,
+                       'rows': None, 'cache_hits': 0, 'cache_misses': 0}
+        self._token = _open.set(parents + (self.record,))
+        self._rss = rss_bytes()
+        self._t0 = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._t0
+        rss = rss_bytes()
+        _open.reset(self._token)
+        self.record.update(
+            seconds=round(seconds, 6),
+            rss_mb=round(rss / 2**20, 1) if rss is not None else None,
+            rss_delta_mb=round((rss - self._rss) / 2**20, 1) if rss is not None and self._rss is not None else None,
+            error=exc_type.__name__ if exc_type else None,
+        )
+        _publish(self.record)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(self.name) as rec:
+                result = func(*args, **kwargs)
+                if self.rows is not None:
+                    try:
+                        rec['rows'] = self.rows(result, *args, **kwargs)
+                    except TypeError:
+                        pass
+            return result
+        return wrapper
+
+
+def note(**counters):
+    """Add counters (e.g. cache_hits=3) to the innermost open stage; no-op outside one."""
+    parents = _open.get()
+    if parents:
+        rec = parents[-1]
+        for key, value in counters.items():
+            rec[key] = rec.get(key, 0) + value
+
+
+@contextmanager
+def collect():
+    """Collect the records of every stage finished inside the block into the yielded list."""
+    records = []
+    token = _sink.set(records)
+    try:
+        yield records
+    finally:
+        _sink.reset(token)
+
+
+def _publish(record):
+    sink = _sink.get()
+    if sink is not None:
+        sink.append(record)
+    with _lock:
+        t = _totals.setdefault(record['stage'], {'calls': 0, 'errors': 0, 'seconds': 0.0, 'rows': 0,
+                                                 'cache_hits': 0, 'cache_misses': 0})
+        t['calls'] += 1
+        t['errors'] += record['error'] is not None
+        t['seconds'] += record['seconds']
+        t['rows'] += record['rows'] or 0
+        t['cache_hits'] += record['cache_hits']
+        t['cache_misses'] += record['cache_misses']
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(record))
+
+
+def replay(records):
+    """Publish records finished elsewhere (e.g. in a worker process) as if they had finished here."""
+    for record in records:
+        _publish(dict(record))
+
+
+def totals():
+    """Process-wide cumulative counters per stage."""
+    with _lock:
+        return {name: dict(t) for name, t in _totals.items()}
+
+
+def prometheus_text():
+    """Cumulative per-stage counters in the Prometheus text exposition format."""
+    metrics = [
+        ('calls', 'analyzer_stage_calls_total', 'Stage invocations.'),
+        ('errors', 'analyzer_stage_errors_total', 'Stage invocations that raised.'),
+        ('seconds', 'analyzer_stage_seconds_total', 'Wall time spent in the stage.'),
+        ('rows', 'analyzer_stage_rows_total', 'Rows processed by the stage.'),
+        ('cache_hits', 'analyzer_stage_cache_hits_total', 'Cache hits (emotion labels, rendered charts).'),
+        ('cache_misses', 'analyzer_stage_cache_misses_total', 'Cache misses (emotion labels, rendered charts).'),
+    ]
+    snapshot = totals()
+    lines = []
+    for field, metric, help_text in metrics:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        lines += [f'{metric}{{stage="{name}"}} {t[field]}' for name, t in sorted(snapshot.items())]
+    rss = rss_bytes()
+    if rss is not None:
+        lines += ["# HELP analyzer_resident_memory_bytes Resident set size.",
+                  "# TYPE analyzer_resident_memory_bytes gauge",
+                  f"analyzer_resident_memory_bytes {rss}"]
+    return '\n'.join(lines) + '\n'
@@ -1,19 +1,30 @@
+from keyword_matcher import KeywordMatcher
+
+# checked in this order; an urgent hit short-circuits the others
+INTENT_KEYWORDS = {
+    'urgent': ['suicide','kill myself','end my life','want to die','help me'],
+    'stressed': ['stressed','stress','anxious','panic','overwhelmed'],
+    'sad': ['sad','depressed','down','unhappy','lonely','hopeless'],
+}
+MATCHER = KeywordMatcher(INTENT_KEYWORDS)
+
+def _intents_from_labels(found):
+    if 'urgent' in found:
+        return ['urgent']
+    return [label for label in ('stressed', 'sad') if label in found]
+
 def detect_intent(text):
     text = text.lower()
-    intents = []
-    urgent = ['suicide','kill myself','end my life','want to die','help me']
-    stress = ['stressed','stress','anxious','panic','overwhelmed']
-    sad = ['sad','depressed','down','unhappy','lonely','hopeless']
-    for w in urgent:
-        if w in text:
-            intents.append('urgent')
-            return intents
-    for w in stress:
-        if w in text:
-            intents.append('stressed')
-            break
-    for w in sad:
-        if w in text:
-            intents.append('sad')
-            break
-    return intents
+    return _intents_from_labels(MATCHER.labels_in(text))
+
+def intent_keywords(text):
+    """(intent, keyword) pairs behind detect_intent(text), one per distinct keyword hit."""
+    text = text.lower()
+    hits = {(label, text[start:end]) for start, end, label in MATCHER.iter_hits(text)}
+    keep = _intents_from_labels({label for label, _ in hits})
+    return sorted(hit for hit in hits if hit[0] in keep)
+
+def detect_intents(series):
+    """Batch version of detect_intent over a pandas Series; each distinct text is matched once."""
+    mapping = {t: _intents_from_labels(MATCHER.labels_in(t)) for t in series.unique()}
+    return series.map(mapping)
@@ -0,0 +1,288 @@
+# Shared worker pool for multi-user deployments of the Streamlit app.
+# Heavy stages (classification, chart rendering, PDF/Excel export) run as jobs on
+# a size-limited process pool shared by every session instead of inline in each
+# session's script thread. Job ids are scoped to their session. Results come
+# back in memory (DataFrames, bytes): workers write nothing outside a per-job
+# temporary directory that is removed when the job ends, and results a session
+# never collected are dropped when the session expires.
+# Admission control keeps one huge upload from starving everyone else:
+#   - a job over `max_job_rows` is refused outright,
+#   - a session may have `max_session_jobs` jobs in flight,
+#   - the pool accepts at most `max_pending_rows` of unfinished work,
+#   - jobs over `large_rows` run in their own lane (`large_workers` processes),
+#     so the workers that serve ordinary chats are never all taken by big ones
+#     (and a worker killed by a huge chat only breaks, and restarts, its lane).
+import itertools
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from instrumentation import collect, replay
+
+POOL_WORKERS = int(os.environ.get('ANALYZER_POOL_WORKERS', 2))
+LARGE_WORKERS = int(os.environ.get('ANALYZER_LARGE_WORKERS', 1))
+LARGE_JOB_ROWS = 200_000
+MAX_JOB_ROWS = int(os.environ.get('ANALYZER_MAX_JOB_ROWS', 2_000_000))
+MAX_PENDING_ROWS = int(os.environ.get('ANALYZER_MAX_PENDING_ROWS', 4_000_000))
+MAX_SESSION_JOBS = 2
+SESSION_TTL_SECONDS = int(os.environ.get('ANALYZER_SESSION_TTL', 3600))
+
+
+class AdmissionError(RuntimeError):
+    """The pool refused a job: too large, the session is busy, or the pool is saturated."""
+
+
+@dataclass
+class Job:
+    job_id: str
+    session_id: str
+    name: str
+    rows: int
+    lane: str
+    future: object = field(repr=False)
+    submitted: float = field(default_factory=time.time)
+
+
+# --- job functions (module level, so they pickle into worker processes) ---
+
+def analyze_messages(df, use_hinglish=True, use_transformer=False, workers=None):
+    """Translate and classify parsed messages; returns (df, notes) with notes as (st function, text) pairs."""
+    from emotion_classifier import get_emotions
+    notes = []
+    if use_hinglish:
+        from utils.hinglish_translation import translate_series
+        df = df.assign(message=translate_series(df['message']))
+    if use_transformer:
+        try:
+            from transformer_emotion import predict_with_transformer
+            df = predict_with_transformer(df)
+            notes.append(("success", "Used transformer-based emotion classifier."))
+            return df, notes
+        except Exception as e:
+            notes.append(("error", "Transformer classifier failed to load. Falling back to lightweight classifier. Error: " + str(e)))
+    return get_emotions(df, workers=workers), notes
+
+
+def chart_images(df, cube, charts, out_dir=None, workers=None):
+    """{chart name: PNG bytes}; with no `out_dir` the images are drawn in a temporary directory."""
+    from chart_renderer import render_charts
+    with tempfile.TemporaryDirectory(prefix='charts-') as tmp:
+        paths = render_charts(df, cube, charts=charts, out_dir=out_dir or tmp, workers=workers)
+        images = {}
+        for name, path in paths.items():
+            with open(path, 'rb') as f:
+                images[name] = f.read()
+    return images
+
+
+def export_bundle(df, cube, out_dir=None, workers=None):
+    """CSV / Excel / PNG zip / PDF bytes, built in memory from one set of chart images."""
+    from chart_renderer import render_charts
+    from export_utils import export_excel_stream, export_png_bundle
+    from generate_pdf_report import generate_pdf_report
+    with tempfile.TemporaryDirectory(prefix='export-') as tmp:
+        charts = render_charts(df, cube, out_dir=out_dir or tmp, workers=workers)
+        return {'csv': df.to_csv(index=False).encode('utf-8'),
+                'excel': export_excel_stream(df, cube=cube).getvalue(),
+                'zip': export_png_bundle(df, None, cube=cube, charts=charts).getvalue(),
+                'pdf': generate_pdf_report(df, None, cube=cube, charts=charts).getvalue()}
+
+
+# every thread that swaps sys.modules['__main__'] holds this, so swaps never interleave
+_MAIN_LOCK = threading.Lock()
+
+
+@contextmanager
+def bare_main():
+    """
+    Spawn worker processes inside this block: spawned workers re-import the
+    parent's __main__, which under Streamlit is the app script itself, so
+    they are started from an empty one instead. Concurrent callers wait for
+    each other; keep the block short.
+    """
+    with _MAIN_LOCK:
+        main = sys.modules['__main__']
+        bare = sys.modules['__main__'] = types.ModuleType('__main__')
+        try:
+            yield
+        finally:
+            # Streamlit may have installed another script run's module meanwhile; keep that one
+            if sys.modules['__main__'] is bare:
+                sys.modules['__main__'] = main
+
+
+class SpawnPool(ProcessPoolExecutor):
+    """
+    ProcessPoolExecutor whose workers are spawned, never forked (the Streamlit
+    server is multi-threaded), and started from an empty __main__: workers
+    start on submit(), so every submit (and map) runs under bare_main().
+    """
+
+    def __init__(self, max_workers):
+        super().__init__(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def submit(self, fn, /, *args, **kwargs):
+        with bare_main():
+            return super().submit(fn, *args, **kwargs)
+
+
+def _run(fn, args, kwargs):
+    # worker side: keep the stage records so the submitting session can show them
+    with collect() as records:
+        result = fn(*args, **kwargs)
+    return result, records
+
+
+class JobPool:
+    """
+    Process pool shared by all sessions, with per-session job ids and admission control.
+
+        pool = JobPool(workers=2)
+        job = pool.submit(session_id, analyze_messages, df, rows=len(df))
+        df, notes = pool.result(job)
+        # or both at once:
+        df, notes = pool.run(session_id, analyze_messages, df, rows=len(df))
+
+    `rows` is the job's size for admission (messages to process). submit()
+    raises AdmissionError when the job is refused. Worker processes are
+    spawned on demand (only ever from submit()); a lane whose pool broke,
+    e.g. a worker killed for memory, gets a fresh pool on its next job.
+    """
+
+    def __init__(self, workers=POOL_WORKERS, large_workers=LARGE_WORKERS, large_rows=LARGE_JOB_ROWS,
+                 max_job_rows=MAX_JOB_ROWS, max_pending_rows=MAX_PENDING_ROWS,
+                 max_session_jobs=MAX_SESSION_JOBS, ttl=SESSION_TTL_SECONDS):
+        self.lanes = {'small': workers, 'large': large_workers}
+        self.large_rows = large_rows
+        self.max_job_rows = max_job_rows
+        self.max_pending_rows = max_pending_rows
+        self.max_session_jobs = max_session_jobs
+        self.ttl = ttl
+        self.jobs = {}       # job id -> Job, until its result is collected or the session expires
+        self.sessions = {}   # session id -> last activity (time.time())
+        self.stats = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'expired_sessions': 0}
+        self._executors = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _executor(self, lane):
+        if lane not in self._executors:
+            self._executors[lane] = SpawnPool(self.lanes[lane])
+        return self._executors[lane]
+
+    def _start(self, lane, fn, args, kwargs):
+        try:
+            return self._executor(lane).submit(_run, fn, args, kwargs)
+        except BrokenProcessPool:
+            self._executors.pop(lane).shutdown(wait=False)
+            return self._executor(lane).submit(_run, fn, args, kwargs)
+
+    def touch(self, session_id):
+        """Mark a session active so its results are not expired."""
+        with self._lock:
+            self.sessions[session_id] = time.time()
+
+    def _refusal(self, session_id, rows):
+        if rows > self.max_job_rows:
+            return f"This chat is too large to analyze here ({rows:,} messages; the limit is {self.max_job_rows:,})."
+        unfinished = [j for j in self.jobs.values() if not j.future.done()]
+        if sum(j.session_id == session_id for j in unfinished) >= self.max_session_jobs:
+            return "Your earlier requests are still running. Try again when they finish."
+        if sum(j.rows for j in unfinished) + rows > self.max_pending_rows:
+            return "The analyzer is busy with other users' chats. Try again in a minute."
+        return None
+
+    def admit(self, session_id, rows):
+        """Raise AdmissionError if a job of `rows` would be refused now (check before expensive preparation)."""
+        with self._lock:
+            reason = self._refusal(session_id, rows)
+            if reason:
+                self.stats['rejected'] += 1
+                raise AdmissionError(reason)
+
+    def submit(self, session_id, fn, *args, rows=0, name=None, **kwargs):
+        """Queue fn(*args, **kwargs) on the pool; returns the job id."""
+        self.expire()
+        with self._lock:
+            reason = self._refusal(session_id, rows)
+            if reason:
+                self.stats['rejected'] += 1
+                raise AdmissionError(reason)
+            lane = 'large' if rows > self.large_rows else 'small'
+            job_id = f"{session_id}-{next(self._ids)}"
+            future = self._start(lane, fn, args, kwargs)
+            self.jobs[job_id] = Job(job_id, session_id, name or fn.__name__, rows, lane, future)
+            self.sessions[session_id] = time.time()
+            self.stats['submitted'] += 1
+        return job_id
+
+    def status(self, job_id):
+        """'queued', 'running', 'done', 'failed', 'cancelled', or 'unknown' (collected or expired)."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return 'unknown'
+        future = job.future
+        if future.cancelled():
+            return 'cancelled'
+        if future.done():
+            return 'failed' if future.exception() is not None else 'done'
+        return 'running' if future.running() else 'queued'
+
+    def result(self, job_id, timeout=None):
+        """Wait for a job and return its result; the job (and its result) then leaves the pool."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"unknown or expired job {job_id}")
+        try:
+            result, records = job.future.result(timeout)
+        except Exception:
+            if job.future.done():
+                self.stats['failed'] += 1
+                self.jobs.pop(job_id, None)
+            raise
+        self.stats['completed'] += 1
+        self.jobs.pop(job_id, None)
+        replay(records)
+        return result
+
+    def run(self, session_id, fn, *args, rows=0, name=None, timeout=None, **kwargs):
+        return self.result(self.submit(session_id, fn, *args, rows=rows, name=name, **kwargs), timeout)
+
+    def session_jobs(self, session_id):
+        return {job_id: self.status(job_id) for job_id, job in list(self.jobs.items()) if job.session_id == session_id}
+
+    def close_session(self, session_id):
+        """Cancel a session's queued jobs and drop all of its results."""
+        with self._lock:
+            for job_id in [j for j, job in self.jobs.items() if job.session_id == session_id]:
+                self.jobs.pop(job_id).future.cancel()
+            self.sessions.pop(session_id, None)
+
+    def expire(self, now=None):
+        """Close sessions idle for longer than `ttl` seconds; returns how many were closed."""
+        now = time.time() if now is None else now
+        idle = [s for s, seen in list(self.sessions.items()) if now - seen > self.ttl]
+        for session_id in idle:
+            self.close_session(session_id)
+        self.stats['expired_sessions'] += len(idle)
+        return len(idle)
+
+    def snapshot(self):
+        """Counters plus the current queue, for monitoring."""
+        with self._lock:
+            unfinished = [j for j in self.jobs.values() if not j.future.done()]
+            return dict(self.stats, workers=dict(self.lanes), sessions=len(self.sessions),
+                        unfinished_jobs=len(unfinished), pending_rows=sum(j.rows for j in unfinished))
+
+    def shutdown(self, wait=True):
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait, cancel_futures=True)
+        self._executors.clear()
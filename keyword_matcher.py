@@ -0,0 +1,129 @@
+# Multi-pattern keyword matcher (Aho-Corasick) shared by emotion_classifier and intent_detector.
+# Uses the `pyahocorasick` C extension when installed, otherwise a pure-Python automaton.
+from collections import deque
+
+SUBSTRING, WORD, PREFIX = 'substring', 'word', 'prefix'
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordMatcher:
+    """
+    Compiled matcher over a lexicon {label: [keywords]} whose label order is the priority order.
+    Finds every keyword hit in a single pass over the text.
+
+    mode:
+      'substring' - keyword may appear anywhere (the original `w in text` behaviour)
+      'word'      - keyword must be a whole word; a trailing '*' marks a stem prefix ('depress*')
+      'prefix'    - every keyword is a stem prefix (must start at a word boundary)
+    """
+
+    def __init__(self, lexicon, mode=SUBSTRING):
+        self.labels = list(lexicon)
+        self.mode = mode
+        patterns = {}
+        for idx, label in enumerate(self.labels):
+            for kw in lexicon[label]:
+                kw = kw.lower()
+                boundary = mode
+                if kw.endswith('*'):
+                    kw = kw[:-1]
+                    boundary = SUBSTRING if mode == SUBSTRING else PREFIX
+                if kw:
+                    patterns.setdefault(kw, []).append((len(kw), idx, boundary))
+        self._build(patterns)
+
+    def _build(self, patterns):
+        try:
+            import ahocorasick
+        except ImportError:
+            ahocorasick = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for kw, payloads in patterns.items():
+                self._automaton.add_word(kw, payloads)
+            if patterns:
+                self._automaton.make_automaton()
+            return
+
+        self._automaton = None
+        goto, fail, out = [{}], [0], [[]]
+        for kw, payloads in patterns.items():
+            node = 0
+            for ch in kw:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    out.append([])
+                node = nxt
+            out[node].extend(payloads)
+
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def _raw_hits(self, text):
+        if self._automaton is not None:
+            if len(self._automaton):
+                yield from self._automaton.iter(text)
+            return
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                yield i, out[node]
+
+    def _hits(self, text):
+        if not isinstance(text, str):
+            return
+        text = text.lower()
+        n = len(text)
+        for end, payloads in self._raw_hits(text):
+            for length, idx, boundary in payloads:
+                start = end - length + 1
+                if boundary != SUBSTRING:
+                    if start > 0 and _is_word_char(text[start - 1]):
+                        continue
+                    if boundary == WORD and end + 1 < n and _is_word_char(text[end + 1]):
+                        continue
+                yield start, end + 1, idx
+
+    def iter_hits(self, text):
+        """Yield (start, end, label) for every keyword hit that satisfies the boundary rules."""
+        for start, end, idx in self._hits(text):
+            yield start, end, self.labels[idx]
+
+    def labels_in(self, text):
+        """Set of labels with at least one keyword hit."""
+        return {label for _, _, label in self.iter_hits(text)}
+
+    def first_label(self, text, default=None):
+        """Highest-priority label hit in `text`, or `default`."""
+        best = None
+        for _, _, idx in self._hits(text):
+            if best is None or idx < best:
+                best = idx
+                if best == 0:
+                    break
+        return default if best is None else self.labels[best]
+
+    def label_series(self, series, default=None):
+        """Label a whole pandas Series at once; each distinct text is matched only once."""
+        mapping = {t: self.first_label(t, default) for t in series.unique()}
+        return series.map(mapping)
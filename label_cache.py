@@ -0,0 +1,121 @@
+# Content-addressed emotion label cache shared by the keyword and transformer classifiers.
+# Bounded in-memory LRU in front of a SQLite file, keyed by
+# hash(normalized message, classifier name, model version).
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from instrumentation import note
+
+CACHE_PATH = os.environ.get("EMOTION_CACHE_PATH", os.path.join(".cache", "emotion_labels.sqlite"))
+MEMORY_ITEMS = 100_000
+
+
+def normalize(text):
+    # whitespace differences never change a label, so collapse them
+    if not isinstance(text, str):
+        return ''
+    return ' '.join(text.split())
+
+
+def cache_key(text, classifier, version):
+    return hashlib.sha1(f"{classifier}\0{version}\0{text}".encode("utf-8")).hexdigest()
+
+
+class LabelCache:
+    def __init__(self, path=CACHE_PATH, memory_items=MEMORY_ITEMS):
+        self.path = path
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # generous timeout: batch workers in other processes may hold the write lock
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self._db.execute("CREATE TABLE IF NOT EXISTS labels (key TEXT PRIMARY KEY, label TEXT NOT NULL)")
+        self._db.commit()
+
+    def _remember(self, key, label):
+        self.memory[key] = label
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """Return {key: label} for the keys that are cached."""
+        found = {}
+        with self._lock:
+            missing = []
+            for k in keys:
+                if k in self.memory:
+                    self.memory.move_to_end(k)
+                    found[k] = self.memory[k]
+                else:
+                    missing.append(k)
+            # SQLite limits bound parameters per statement
+            for start in range(0, len(missing), 900):
+                part = missing[start:start + 900]
+                rows = self._db.execute(
+                    f"SELECT key, label FROM labels WHERE key IN ({','.join('?' * len(part))})", part)
+                for k, label in rows:
+                    found[k] = label
+                    self._remember(k, label)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Store an iterable of (key, label) pairs."""
+        items = list(items)
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO labels (key, label) VALUES (?, ?)", items)
+            self._db.commit()
+            for k, label in items:
+                self._remember(k, label)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM labels")
+            self._db.commit()
+            self.memory.clear()
+            self.hits = self.misses = 0
+
+
+_cache = None
+
+
+def get_cache():
+    """Process-wide cache instance, created on first use."""
+    global _cache
+    if _cache is None:
+        _cache = LabelCache()
+    return _cache
+
+
+def cached_labels(texts, classifier, version, classify_fn, cache=None):
+    """
+    Label `texts` using the cache, calling `classify_fn(list_of_texts)` only for
+    the unique normalized texts that are not cached yet.
+    Returns a list of labels in the same order as `texts`.
+    """
+    cache = cache or get_cache()
+    normalized = [normalize(t) for t in texts]
+    keys = {t: cache_key(t, classifier, version) for t in dict.fromkeys(normalized)}
+    found = cache.get_many(list(keys.values()))
+    by_text = {t: found[k] for t, k in keys.items() if k in found}
+
+    todo = [t for t in keys if t not in by_text]
+    note(cache_hits=len(by_text), cache_misses=len(todo))
+    if todo:
+        labels = classify_fn(todo)
+        by_text.update(zip(todo, labels))
+        cache.put_many((keys[t], label) for t, label in zip(todo, labels))
+    return [by_text[t] for t in normalized]
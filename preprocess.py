@@ -1,56 +1,281 @@
 import pandas as pd
+import io
+import os
 import re
-from datetime import datetime
+from itertools import chain, islice
 
-def clean_chat(file):
+from instrumentation import output_rows, stage
+
+# pattern with optional AM/PM (kept as part of the time group)
+PATTERN = re.compile(r'^(\d{1,2}/\d{1,2}/\d{2,4}),\s+(\d{1,2}:\d{2}(?:\s?[APMapm]{2})?)\s+-\s+([^:]+):\s+(.*)$')
+COLUMNS = ['timestamp', 'sender', 'message']
+# canonical schema of an analyzed chat (see compact_chat)
+ANALYZED_COLUMNS = COLUMNS + ['emotion']
+ALIAS_COLUMNS = ['Date', 'Emotion']  # legacy duplicates added by emotion_trend.ensure_date_emotion
+# whole-message placeholders WhatsApp writes instead of content (compared lowercased)
+MEDIA_PLACEHOLDERS = {
+    '<media omitted>', 'image omitted', 'video omitted', 'audio omitted', 'sticker omitted',
+    'gif omitted', 'document omitted', 'contact card omitted', 'this message was deleted',
+    'you deleted this message', 'null',
+}
+CHUNK_SIZE = 100_000
+SAMPLE_LINES = 2000
+
+
+def detect_date_format(samples):
     """
-    Parse WhatsApp exported .txt content (file-like) into a DataFrame.
-    Accepts uploaded file or raw string.
-    Returns DataFrame with columns: timestamp, sender, message
+    Detect the export's timestamp format from a sample of (date, time) strings.
+    Works out DD/MM vs MM/DD, 2- vs 4-digit years and 12h vs 24h clocks.
+    Ambiguous samples fall back to DD/MM (the common WhatsApp locale).
+    Returns (format, ambiguous): a format string for pd.to_datetime, e.g.
+    "%d/%m/%Y %I:%M%p", and whether the day/month order was a guess (no
+    sampled date had a part above 12).
+    """
+    max_first = max_second = 0
+    long_years = short_years = 0
+    twelve_hour = False
+    for date, time in samples:
+        first, second, year = date.split('/')
+        max_first = max(max_first, int(first))
+        max_second = max(max_second, int(second))
+        if len(year) == 4:
+            long_years += 1
+        else:
+            short_years += 1
+        if time[-1:].isalpha():
+            twelve_hour = True
+
+    day_month = '%m/%d' if max_second > 12 and max_first <= 12 else '%d/%m'
+    year = '%Y' if long_years >= short_years else '%y'
+    clock = '%I:%M%p' if twelve_hour else '%H:%M'
+    ambiguous = max_first <= 12 and max_second <= 12
+    return f"{day_month}/{year} {clock}", ambiguous
+
+
+def parse_timestamps(dates, times, date_format):
+    """Parse date/time string columns in one vectorized call; failures become NaT."""
+    times = pd.Series(times, dtype=object).str.replace(r'\s+', '', regex=True).str.upper()
+    stamps = pd.Series(dates, dtype=object) + ' ' + times
+    parsed = pd.to_datetime(stamps, format=date_format, errors='coerce')
+    # exports occasionally mix year widths or clocks; retry only the failed rows
+    year = date_format.replace('%Y', '%y') if '%Y' in date_format else date_format.replace('%y', '%Y')
+    for alt in (year, _swap_clock(date_format), _swap_clock(year)):
+        failed = parsed.isna()
+        if not failed.any():
+            break
+        parsed[failed] = pd.to_datetime(stamps[failed], format=alt, errors='coerce')
+    return parsed
+
+
+def day_month_votes(dates, date_format):
+    """
+    (rows whose date is only valid in date_format's day/month order,
+     rows only valid with day and month swapped); dates with both parts
+    <= 12 (or both above) count for neither.
+    """
+    parts = pd.Series(dates, dtype=object).str.split('/', n=2, expand=True)
+    day, month = parts[0].astype(int), parts[1].astype(int)
+    if not date_format.startswith('%d/%m'):
+        day, month = month, day
+    return int(((day > 12) & (month <= 12)).sum()), int(((month > 12) & (day <= 12)).sum())
+
+
+def _swap_clock(date_format):
+    if '%I:%M%p' in date_format:
+        return date_format.replace('%I:%M%p', '%H:%M')
+    return date_format.replace('%H:%M', '%I:%M%p')
+
+
+def _swap_day_month(date_format):
+    if date_format.startswith('%d/%m'):
+        return '%m/%d' + date_format[5:]
+    return '%d/%m' + date_format[5:]
+
+
+def _iter_lines(file):
+    """
+    Yield lines one at a time from a path, a file-like object (text or bytes)
+    or a raw string, without loading the whole export into memory.
+    Only os.PathLike objects (e.g. pathlib.Path) are opened as paths: a str is
+    always chat text, so uploaded content can never name a file to read.
     """
     if hasattr(file, "read"):
-        raw = file.read()
-        try:
-            raw = raw.decode("utf-8")
-        except Exception:
-            raw = str(raw)
+        if isinstance(file.read(0), bytes):
+            text = io.TextIOWrapper(file, encoding="utf-8", errors="replace")
+            try:
+                yield from text
+            finally:
+                # don't let the wrapper close the caller's file
+                text.detach()
+        else:
+            yield from file
+    elif isinstance(file, os.PathLike):
+        with open(file, encoding="utf-8", errors="replace") as f:
+            yield from f
     else:
-        raw = str(file)
+        yield from io.StringIO(str(file))
+
+
+def _rewind_point(file):
+    """Where `file` can be read again from: 0 for paths and strings, the offset of a seekable file, else None."""
+    if not hasattr(file, 'read'):
+        return 0
+    return file.tell() if hasattr(file, 'seek') and file.seekable() else None
 
-    lines = raw.splitlines()
-    # pattern with optional AM/PM
-    pattern = r'^(\d{1,2}/\d{1,2}/\d{2,4}),\s+(\d{1,2}:\d{2})(?:\s?[APMapm]{2})?\s+-\s+([^:]+):\s+(.*)$'
+
+def _rewind(file, start):
+    if hasattr(file, 'seek'):
+        file.seek(start)
+
+
+def _to_frame(rows, date_format):
+    dates, times, senders, messages = zip(*rows)
+    timestamps = parse_timestamps(dates, times, date_format)
+    df = pd.DataFrame({'timestamp': timestamps, 'sender': senders, 'message': messages})
+    df.attrs['date_format'] = date_format
+    df.attrs['parse_failures'] = int(timestamps.isna().sum())
+    return df
+
+
+def iter_chat_chunks(file, chunksize=CHUNK_SIZE, date_format=None):
+    """
+    Stream a WhatsApp export and yield DataFrames of at most `chunksize` messages.
+    Accepts a path (os.PathLike), an uploaded file / file-like object or raw string.
+    Continuation lines are appended to the message they belong to, even when
+    that message started in the previous chunk, because a message is only
+    emitted once the next message header has been seen.
+    The timestamp format is detected once from the first SAMPLE_LINES lines
+    unless `date_format` is given. Each chunk records its `date_format` and
+    `parse_failures` (rows whose timestamp did not parse and were left as
+    NaT) in `df.attrs`. If the sample left the day/month order undecided, the
+    first chunk with dates that settle it decides by majority (day_month_votes),
+    before it is parsed, and that order is kept for the rest of the export;
+    dates that contradict the decided order are parse failures.
+    Rows are yielded in file order.
+    """
+    lines = _iter_lines(file)
+    undecided = False
+    if date_format is None:
+        head = list(islice(lines, SAMPLE_LINES))
+        samples = [m.group(1, 2) for m in map(PATTERN.match, (l.strip() for l in head)) if m]
+        date_format, undecided = detect_date_format(samples)
+        lines = chain(head, lines)
+
+    def frame(rows):
+        nonlocal date_format, undecided
+        if undecided:
+            keep, swap = day_month_votes([r[0] for r in rows], date_format)
+            if keep or swap:
+                undecided = False
+                if swap > keep:
+                    date_format = _swap_day_month(date_format)
+        return _to_frame(rows, date_format)
 
     rows = []
     current = None
     for line in lines:
         line = line.strip()
-        m = re.match(pattern, line)
+        m = PATTERN.match(line)
         if m:
             if current:
                 rows.append(current)
+                if len(rows) >= chunksize:
+                    yield frame(rows)
+                    rows = []
             date, time, sender, message = m.groups()
-            # Try common datetime formats
-            dt = None
-            for fmt in ["%d/%m/%Y %H:%M", "%d/%m/%y %H:%M", "%d/%m/%Y %I:%M %p", "%d/%m/%y %I:%M %p"]:
-                try:
-                    dt = datetime.strptime(f"{date} {time}", fmt)
-                    break
-                except Exception:
-                    continue
-            if dt is None:
-                dt = pd.NaT
-            current = {"timestamp": dt, "sender": sender.strip(), "message": message.strip()}
+            current = [date, time, sender.strip(), message.strip()]
         else:
             if current:
-                current["message"] += " " + line
+                current[3] += " " + line
 
     if current:
         rows.append(current)
+    if rows:
+        yield frame(rows)
 
-    df = pd.DataFrame(rows)
-    if 'timestamp' in df.columns:
-        df = df.dropna(subset=['timestamp']).sort_values('timestamp').reset_index(drop=True)
-    else:
-        df['timestamp'] = pd.NaT
+
+@stage('clean_chat', rows=output_rows)
+def clean_chat(file):
+    """
+    Parse WhatsApp exported .txt content (file-like) into a DataFrame.
+    Accepts uploaded file, raw string or path (os.PathLike, e.g. pathlib.Path).
+    Returns DataFrame with columns: timestamp, sender, message
+    The detected format and the number of messages dropped because their
+    timestamp failed to parse are available as df.attrs['date_format'] and
+    df.attrs['parse_failures'].
+    If the day/month order was only settled after the first chunk (see
+    iter_chat_chunks), the export is parsed again with the settled order so
+    earlier ambiguous dates agree with it (file-like inputs must be seekable
+    for that).
+    """
+    start = _rewind_point(file)
+    chunks = list(iter_chat_chunks(file))
+    if chunks and chunks[-1].attrs['date_format'] != chunks[0].attrs['date_format'] and start is not None:
+        _rewind(file, start)
+        chunks = list(iter_chat_chunks(file, date_format=chunks[-1].attrs['date_format']))
+    if not chunks:
+        df = pd.DataFrame({c: pd.Series(dtype='datetime64[ns]' if c == 'timestamp' else object) for c in COLUMNS})
+        df.attrs['parse_failures'] = 0
+        return df
+    failures = sum(c.attrs['parse_failures'] for c in chunks)
+    date_format = chunks[0].attrs['date_format']
+    df = pd.concat(chunks, ignore_index=True)
+    # stable sort keeps same-minute messages in file order (incremental.py relies on it)
+    df = df.dropna(subset=['timestamp']).sort_values('timestamp', kind='stable').reset_index(drop=True)
+    df.attrs = {'date_format': date_format, 'parse_failures': failures}
     return df
+
+
+def compact_chat(df, arrow_strings=True):
+    """
+    Enforce the canonical analyzed-chat schema at the end of ingestion:
+    timestamp datetime64, sender/emotion categorical, and (with `arrow_strings`
+    and pyarrow installed) an Arrow-backed message column. Legacy Date/Emotion
+    alias columns are dropped; other columns are kept as they are.
+    Only columns whose dtype changes are converted.
+    """
+    df = df.drop(columns=[c for c in ALIAS_COLUMNS if c in df.columns])
+    dtypes = {}
+    if 'timestamp' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    for col in ('sender', 'emotion'):
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            dtypes[col] = 'category'
+    if arrow_strings and 'message' in df.columns and df['message'].dtype != 'string[pyarrow]':
+        try:
+            import pyarrow  # noqa: F401
+            dtypes['message'] = 'string[pyarrow]'
+        except ImportError:
+            pass
+    return df.astype(dtypes) if dtypes else df
+
+
+def chat_to_parquet(file, outpath, chunksize=CHUNK_SIZE, date_format=None):
+    """
+    Stream a WhatsApp export straight into a Parquet file, one row group per chunk,
+    so memory stays bounded by `chunksize` regardless of the export size.
+    Rows keep file order (WhatsApp exports are already chronological).
+    Like clean_chat, the file is written again if the day/month order was only
+    settled after the first chunk (and `file` can be re-read).
+    Requires: pyarrow
+    Returns the number of messages written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([('timestamp', pa.timestamp('ns')), ('sender', pa.string()), ('message', pa.string())])
+    if os.path.dirname(outpath):
+        os.makedirs(os.path.dirname(outpath), exist_ok=True)
+    start = _rewind_point(file)
+    total = 0
+    formats = []
+    with pq.ParquetWriter(outpath, schema) as writer:
+        for chunk in iter_chat_chunks(file, chunksize, date_format):
+            formats.append(chunk.attrs['date_format'])
+            chunk = chunk.dropna(subset=['timestamp'])
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            total += len(chunk)
+    if formats and formats[-1] != formats[0] and start is not None:
+        _rewind(file, start)
+        return chat_to_parquet(file, outpath, chunksize, date_format=formats[-1])
+    return total
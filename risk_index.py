@@ -0,0 +1,142 @@
+# Risk screening over a whole chat, built once at ingestion.
+# Intent detection runs once per distinct message text. Every flagged message is
+# posted under (intent), (intent, sender), (intent, keyword) and
+# (intent, keyword, sender), and each posting list is kept sorted by time.
+# "Urgent messages from X in the last 7 days" is then a dict lookup plus two
+# binary searches, not a scan of the DataFrame. Rolling per-sender risk scores
+# are computed from the same postings.
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage
+from intent_detector import INTENT_KEYWORDS, intent_keywords
+
+RISK_WEIGHTS = {'urgent': 5.0, 'stressed': 2.0, 'sad': 1.0}
+RISK_WINDOW_DAYS = 7
+
+
+def _ns(timestamp):
+    return pd.Timestamp(timestamp).as_unit('ns').value
+
+
+class RiskIndex:
+    """
+    Inverted index intent/keyword -> (sender, timestamp, row id).
+
+        risk = RiskIndex.from_frame(df)
+        rows = risk.lookup('urgent', sender='Priya', last_days=7)
+        df.iloc[rows]
+        risk.risk_scores()   # per-sender rolling scores
+
+    Row ids are positions in the DataFrame(s) passed to add(), in order.
+    """
+
+    def __init__(self):
+        self._batches = []   # DataFrames of (intent, keyword, sender, time, row), one per add()
+        self._frozen = None  # (intent, keyword|None, sender|None) -> (times, rows), built on first query
+        self.senders = set()
+        self.n_rows = 0
+        self.newest = None
+
+    @classmethod
+    def from_frame(cls, df, **columns):
+        return cls().add(df, **columns)
+
+    @stage('risk_index')
+    def add(self, df, sender_col='sender', message_col='message', time_col='timestamp'):
+        """Index a batch of messages (call repeatedly for chunked / incremental ingestion)."""
+        if df.empty:
+            return self
+        codes, uniques = pd.factorize(df[message_col].fillna('').astype(str))
+        hits = pd.DataFrame([(code, intent, keyword) for code, text in enumerate(uniques)
+                             for intent, keyword in intent_keywords(text)],
+                            columns=['code', 'intent', 'keyword'])
+        times = pd.to_datetime(df[time_col]).to_numpy(dtype='datetime64[ns]').view('int64')
+
+        flagged = np.nonzero(np.isin(codes, hits['code'].unique()))[0]
+        if len(flagged):
+            messages = pd.DataFrame({'code': codes[flagged], 'sender': df[sender_col].astype(str).to_numpy()[flagged],
+                                     'time': times[flagged], 'row': flagged + self.n_rows})
+            self._batches.append(messages.merge(hits, on='code')[['intent', 'keyword', 'sender', 'time', 'row']])
+            self._frozen = None
+
+        self.senders.update(df[sender_col].astype(str).unique())
+        self.n_rows += len(df)
+        newest = int(times.max())
+        self.newest = newest if self.newest is None else max(self.newest, newest)
+        return self
+
+    def _postings(self):
+        if self._frozen is None:
+            self._frozen = {}
+            if self._batches:
+                hits = pd.concat(self._batches, ignore_index=True).sort_values('time', kind='stable', ignore_index=True)
+                per_message = hits.drop_duplicates(['row', 'intent'])
+                times, rows = hits['time'].to_numpy(), hits['row'].to_numpy()
+                m_times, m_rows = per_message['time'].to_numpy(), per_message['row'].to_numpy()
+                for table, by, t, r in ((hits, ['intent', 'keyword', 'sender'], times, rows),
+                                        (hits, ['intent', 'keyword'], times, rows),
+                                        (per_message, ['intent', 'sender'], m_times, m_rows),
+                                        (per_message, ['intent'], m_times, m_rows)):
+                    for key, pos in table.groupby(by, sort=False).indices.items():
+                        key = key if isinstance(key, tuple) else (key,)
+                        full = dict(zip(by, key))
+                        # positions come back ascending, so each list stays time-ordered
+                        self._frozen[(full['intent'], full.get('keyword'), full.get('sender'))] = (t[pos], r[pos])
+        return self._frozen
+
+    def _arrays(self, key):
+        empty = np.empty(0, 'int64')
+        return self._postings().get(key, (empty, empty))
+
+    def _window(self, since, until, last_days):
+        lo = _ns(since) if since is not None else None
+        if last_days is not None and self.newest is not None:
+            start = self.newest - int(timedelta(days=last_days).total_seconds() * 1e9)
+            lo = start if lo is None else max(lo, start)
+        hi = _ns(until) if until is not None else None
+        return lo, hi
+
+    def lookup(self, intent, sender=None, keyword=None, since=None, until=None, last_days=None):
+        """
+        Row ids of messages with `intent` (optionally one keyword / sender) in the
+        time window, oldest first. last_days counts back from the newest message.
+        """
+        times, rows = self._arrays((intent, keyword, sender))
+        lo, hi = self._window(since, until, last_days)
+        start = np.searchsorted(times, lo, 'left') if lo is not None else 0
+        stop = np.searchsorted(times, hi, 'right') if hi is not None else len(times)
+        return rows[start:stop]
+
+    def count(self, intent, sender=None, keyword=None, since=None, until=None, last_days=None):
+        return len(self.lookup(intent, sender, keyword, since, until, last_days))
+
+    def keywords(self, intent):
+        """Keywords of `intent` that occur in the chat, with message counts."""
+        return {kw: len(rows) for (i, kw, s), (_, rows) in self._postings().items()
+                if i == intent and kw is not None and s is None}
+
+    def risk_scores(self, at=None, window_days=RISK_WINDOW_DAYS, weights=RISK_WEIGHTS):
+        """
+        Per-sender rolling risk over the `window_days` ending at `at` (default:
+        the newest message): message counts per intent and their weighted sum.
+        Only flagged senders' postings are touched.
+        """
+        until = pd.Timestamp(at) if at is not None else (pd.Timestamp(self.newest) if self.newest is not None else None)
+        since = until - timedelta(days=window_days) if until is not None else None
+        flagged = {s for (i, kw, s) in self._postings() if kw is None and s is not None}
+        records = []
+        for sender in flagged:
+            row = {'sender': sender}
+            for intent in INTENT_KEYWORDS:
+                row[intent] = self.count(intent, sender, since=since, until=until)
+            row['score'] = sum(weights.get(i, 0.0) * row[i] for i in INTENT_KEYWORDS)
+            urgent_times, _ = self._arrays(('urgent', None, sender))
+            row['last_urgent'] = pd.Timestamp(urgent_times[-1]) if len(urgent_times) else pd.NaT
+            records.append(row)
+        columns = ['sender', *INTENT_KEYWORDS, 'score', 'last_urgent']
+        scores = pd.DataFrame(records, columns=columns)
+        scores = scores[scores['score'] > 0] if not scores.empty else scores
+        return scores.sort_values(['score', 'sender'], ascending=[False, True], ignore_index=True)
@@ -1,15 +1,16 @@
 import streamlit as st
 import pandas as pd
+import hashlib
+import io
 import os
-from preprocess import clean_chat
-from emotion_classifier import get_emotions as get_emotions_simple
-from emotion_trend import ensure_date_emotion,plot_emotion_trend_plotly,save_emotion_trend_png
-from chatbot_response import generate_response
-from intent_detector import detect_intent
-from utils.hinglish_translation import translate_hinglish_to_english
-from generate_pdf_report import generate_pdf_report
-from utils.hinglish_translation import translate_hinglish_to_english
-from export_utils import export_excel, export_png_bundle, make_zip_bundle
+import uuid
+from preprocess import ANALYZED_COLUMNS, clean_chat, compact_chat
+from aggregate_cube import build_cube
+from risk_index import RISK_WEIGHTS, RISK_WINDOW_DAYS, RiskIndex
+from instrumentation import collect, prometheus_text
+from job_pool import AdmissionError, analyze_messages, chart_images, export_bundle
+# plotting / PDF / Excel modules (matplotlib, plotly, wordcloud, reportlab) are
+# imported where they are used, so the upload screen renders without them
 
 st.set_page_config(
     page_title="Advanced Mental Health Analyzer",
@@ -40,13 +41,23 @@ st.markdown("""
 st.title("🧠 Advanced Mental Health Detection from WhatsApp Chat")
 st.caption("Upload an exported WhatsApp .txt to analyze emotions, trends and get AI support.")
 
+# multi-user deployments: heavy stages run on one shared, size-limited process pool (see job_pool.py),
+# and the .cache/ stores shared by every session (saved analyses, incremental state) are switched off
+MULTI_TENANT = os.environ.get("ANALYZER_MULTI_TENANT", "") not in ("", "0")
+
 # Sidebar
 st.sidebar.header("🔧 Settings & Upload")
 uploaded_file = st.sidebar.file_uploader("Upload WhatsApp chat (.txt)", type=['txt'])
 use_hinglish = st.sidebar.checkbox("Translate Hinglish → English", value=True)
 use_transformer = st.sidebar.checkbox("Use Transformer-based classifier (optional)", value=False)
 use_openai = st.sidebar.checkbox("Enable OpenAI Chatbot (set OPENAI_API_KEY in .env)", value=False)
+SHARED_STORE_OFF = "Not available in multi-user mode: the store under .cache/ is shared by all sessions."
+use_incremental = st.sidebar.checkbox("Incremental re-analysis (reuse results from earlier uploads of this chat, stored under .cache/)", value=False,
+                                      disabled=MULTI_TENANT, help=SHARED_STORE_OFF if MULTI_TENANT else None) and not MULTI_TENANT
+save_parquet = st.sidebar.checkbox("Save analyses for quick reload (Parquet under .cache/analyses)", value=False,
+                                   disabled=MULTI_TENANT, help=SHARED_STORE_OFF if MULTI_TENANT else None) and not MULTI_TENANT
 use_kaleido = st.sidebar.checkbox("Enable kaleido for saving figure images (optional)", value=False)
+show_perf = st.sidebar.checkbox("Show performance panel (per-stage timings)", value=False)
 st.sidebar.markdown("---")
 st.sidebar.markdown(
     "👨‍💻 Tips:\n"
@@ -55,192 +66,346 @@ st.sidebar.markdown(
 )
 
 # Session state
-if "history" not in st.session_state:
-    st.session_state.history = []  # conversation history (user, bot)
-
-if uploaded_file:
-    raw_text = uploaded_file.read().decode("utf-8")
-    st.info("Processing chat...")
-    df = clean_chat(raw_text)
-    if use_hinglish:
-        df['message'] = df['message'].apply(translate_hinglish_to_english)
-
-    # Choose classifier
-    if use_transformer:
-        try:
-            from transformer_emotion import predict_with_transformer
-            df = predict_with_transformer(df)
-            st.success("Used transformer-based emotion classifier.")
-        except Exception as e:
-            st.error("Transformer classifier failed to load. Falling back to lightweight classifier. Error: " + str(e))
-            df = get_emotions_simple(df)
+if "session_id" not in st.session_state:
+    # scopes this session's jobs on the shared pool and its chatbot history
+    st.session_state.session_id = uuid.uuid4().hex
+
+
+# --- Cached pipeline stages (shared across reruns and sessions) ---
+@st.cache_resource(show_spinner=False)
+def job_pool():
+    from job_pool import JobPool
+    return JobPool()
+
+
+def heavy(fn, *args, rows=0, **kwargs):
+    """Run a CPU-heavy stage: on the shared worker pool in multi-tenant mode, else inline."""
+    if not MULTI_TENANT:
+        return fn(*args, **kwargs)
+    # one process per job already; don't nest another pool inside the worker
+    kwargs.setdefault('workers', 1)
+    return job_pool().run(st.session_state.session_id, fn, *args, rows=rows, **kwargs)
+
+
+if MULTI_TENANT:
+    job_pool().touch(st.session_state.session_id)
+
+
+@st.cache_resource(show_spinner="Loading transformer model...")
+def load_transformer_engine(model_name):
+    from transformer_emotion import load_engine
+    return load_engine(model_name)
+
+
+@st.cache_data(show_spinner="Processing chat...", max_entries=8)
+def run_pipeline(digest, _raw, use_hinglish, use_transformer, use_incremental, save_as=None):
+    """
+    Parse, translate and classify one upload. Keyed by the file digest and the
+    settings; `_raw` (the file bytes) is excluded from hashing. With `save_as`
+    the result is also written once to the Parquet analysis store.
+    Returns (df, cube, risk, notes, perf): risk is the intent RiskIndex built
+    during ingestion, notes are (st function name, text) pairs and perf the
+    stage records of the run that produced the result.
+    """
+    with collect() as perf:
+        df, cube, notes = _pipeline(_raw, use_hinglish, use_transformer, use_incremental, save_as)
+        risk = RiskIndex.from_frame(df)
+    return df, cube, risk, notes, perf
+
+
+def _pipeline(raw, use_hinglish, use_transformer, use_incremental, save_as):
+    notes = []
+    if MULTI_TENANT:
+        # refuse an oversized upload before parsing it
+        job_pool().admit(st.session_state.session_id, raw.count(b"\n") + 1)
+    df = clean_chat(io.BytesIO(raw))
+    if df.attrs.get('parse_failures'):
+        notes.append(("warning", f"{df.attrs['parse_failures']} messages skipped: timestamp did not match detected format {df.attrs['date_format']}."))
+
+    def analyze(df):
+        if use_transformer and not MULTI_TENANT:
+            try:
+                from transformer_emotion import DEFAULT_MODEL
+                load_transformer_engine(DEFAULT_MODEL)
+            except Exception:
+                pass  # analyze_messages reports the failure and falls back
+        # translation + classification (on the shared pool in multi-tenant mode)
+        df, new_notes = heavy(analyze_messages, df, use_hinglish, use_transformer, rows=len(df))
+        notes.extend(new_notes)
+        return df
+
+    if use_incremental:
+        from incremental import analyze_incremental
+        total = len(df)
+        df, aggregates, n_new = analyze_incremental(df, analyze, settings=use_hinglish,
+                                                       classifier='transformer' if use_transformer else 'keyword')
+        notes.append(("caption", f"Incremental mode: analyzed {n_new} new messages, reused {total - n_new}."))
     else:
-        df = get_emotions_simple(df)
+        df = analyze(df)
+    # end of ingestion: categorical sender/emotion, Arrow-backed messages
+    df = compact_chat(df)
 
-    st.session_state.df = df
+    if save_as:
+        from chat_store import analysis_path, save_analysis
+        save_analysis(df, analysis_path(save_as))
+        notes.append(("caption", f"Saved analysis as '{save_as}'."))
+    return df, build_cube(df), notes
 
-# Tabs
-tab1, tab2, tab3, tab4 = st.tabs(["📄 Data", "📈 Insights", "🤖 Chatbot", "📥 Export"])
 
-with tab1:
-    st.header("Processed Chat Data")
-    if 'df' in st.session_state:
-        st.dataframe(st.session_state.df[['timestamp', 'sender', 'message', 'emotion']].tail(300))
-    else:
-        st.info("Upload a chat file to view processed data. A sample chat is in /data/sample_chat.txt")
+@st.cache_data(show_spinner="Loading saved analysis...", max_entries=8)
+def load_saved(path, mtime):
+    from chat_store import load_analysis
+    df = compact_chat(load_analysis(path))
+    return df, build_cube(df), RiskIndex.from_frame(df)
+
+
+def tracked(fn, *args):
+    # run a cached artifact builder, keeping the stage records of actual (uncached) work
+    with collect() as records:
+        result = fn(*args)
+    st.session_state.perf = st.session_state.get('perf', []) + records
+    return result
+
+
+def dataset_key():
+    # identifies the analysed chat for artifact caches
+    return st.session_state.get('pipeline_key', id(st.session_state.df))
 
-with tab2:
-    st.header("Insights & Visualizations")
-    
-    if 'df' in st.session_state:
-        df = st.session_state.df
 
-        # 🔹 Standardize all column names to lowercase
-        df.columns = df.columns.str.lower()
+@st.cache_data(show_spinner="Rendering charts...", max_entries=8)
+def insight_images(key, _df, _cube):
+    """Wordcloud + emotion heatmap PNG bytes for the Insights tab."""
+    from chart_renderer import CHART_DIR
+    # multi-tenant: drawn in a per-job temporary directory instead of the shared chart cache
+    images = heavy(chart_images, _df, _cube, ('wordcloud', 'emotion_heatmap'), rows=len(_df),
+                   out_dir=None if MULTI_TENANT else CHART_DIR)
+    return [images['wordcloud'], images['emotion_heatmap']]
 
-        # 🔹 Ensure Date & Emotion columns exist before plotting
+
+@st.cache_data(show_spinner="Preparing exports...", max_entries=8)
+def export_files(key, _df, _cube):
+    """CSV / Excel / PNG zip / PDF bytes, built once per analysed chat from one set of chart images."""
+    from chart_renderer import CHART_DIR
+    # built in memory, never under a shared outputs/ path
+    return heavy(export_bundle, _df, _cube, rows=len(_df), out_dir=None if MULTI_TENANT else CHART_DIR)
+
+
+if uploaded_file:
+    if st.session_state.get('upload_id') != uploaded_file.file_id:
+        st.session_state.upload_id = uploaded_file.file_id
+        st.session_state.digest = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    # the settings change the analysis, so they are part of the saved name
+    settings_tag = f"{'hinglish' if use_hinglish else 'raw'}-{'transformer' if use_transformer else 'keyword'}"
+    save_as = (f"{os.path.splitext(uploaded_file.name)[0]}-{st.session_state.digest[:10]}-{settings_tag}"
+               if save_parquet else None)
+    key = (st.session_state.digest, use_hinglish, use_transformer, use_incremental, save_as)
+    # reruns from widget interaction skip the pipeline entirely
+    if st.session_state.get('pipeline_key') != key:
         try:
-            from emotion_trend import ensure_date_emotion
-            df = ensure_date_emotion(df)
-            st.session_state.df = df  # Save back to session state
-        except ValueError as e:
-            st.error(f"❌ Error preparing data for plotting: {e}")
+            df, cube, risk, notes, perf = run_pipeline(st.session_state.digest, uploaded_file.getvalue(),
+                                                 use_hinglish, use_transformer, use_incremental, save_as)
+        except AdmissionError as e:
+            st.error(f"⏳ {e}")
             st.stop()
+        st.session_state.df = df
+        st.session_state.cube = cube
+        st.session_state.risk = risk
+        st.session_state.notes = notes
+        st.session_state.perf = perf
+        st.session_state.pipeline_key = key
+    for level, text in st.session_state.notes:
+        getattr(st, level)(text)
+elif not MULTI_TENANT:
+    # saved analyses are visible to every session, so they are only offered in single-user mode
+    from chat_store import list_analyses
+    saved = list_analyses()
+    if saved:
+        choice = st.sidebar.selectbox("Or open a saved analysis", ["—"] + list(saved))
+        if choice != "—":
+            mtime = os.path.getmtime(saved[choice])
+            # a re-saved analysis has a new mtime, so chart/export caches don't serve the old data
+            key = ('saved', choice, mtime)
+            if st.session_state.get('pipeline_key') != key:
+                with collect() as perf:
+                    df, cube, risk = load_saved(saved[choice], mtime)
+                st.session_state.df = df
+                st.session_state.cube = cube
+                st.session_state.risk = risk
+                st.session_state.perf = perf
+                st.session_state.pipeline_key = key
 
-        # 🔹 Ensure required columns exist or create defaults
-        if 'timestamp' not in df.columns:
-            possible_date = [c for c in df.columns if 'date' in c.lower() or 'time' in c.lower()]
-            if possible_date:
-                df['timestamp'] = pd.to_datetime(df[possible_date[0]], errors='coerce')
-            else:
-                df['timestamp'] = pd.NaT
+# Tabs
+# on_change="rerun" makes tabs lazy: only the open tab's body runs
+tab1, tab2, tab3, tab4 = st.tabs(["📄 Data", "📈 Insights", "🤖 Chatbot", "📥 Export"], on_change="rerun", key="active_tab")
 
-        if 'sender' not in df.columns:
-            possible_sender = [c for c in df.columns if 'sender' in c.lower() or 'user' in c.lower()]
-            if possible_sender:
-                df['sender'] = df[possible_sender[0]]
-            else:
-                df['sender'] = "Unknown"
+with tab1:
+    st.header("Processed Chat Data")
+    if tab1.open:
+        if 'df' in st.session_state:
+            st.dataframe(st.session_state.df[['timestamp', 'sender', 'message', 'emotion']].tail(300))
+        else:
+            st.info("Upload a chat file to view processed data. A sample chat is in /data/sample_chat.txt")
+
+with tab2:
+    st.header("Insights & Visualizations")
+    if tab2.open:
+        if 'df' in st.session_state:
+            df = st.session_state.df
+
+            # 🔹 Analyzed chats share one compact schema (preprocess.compact_chat): no alias columns, no copies
+            missing = [c for c in ANALYZED_COLUMNS if c not in df.columns]
+            if missing:
+                st.error(f"❌ Processed chat is missing columns: {', '.join(missing)}")
+                st.stop()
+
+            # 🔹 One aggregation pass shared by every chart below
+            cube = st.session_state.get('cube')
+            if cube is None:
+                cube = st.session_state.cube = build_cube(df)
+
+            # 🔹 Imports for visualizations
+            from emotion_trend import plot_emotion_trend_plotly
+            from chat_statistics import (
+                plot_emotion_distribution,
+                plot_top_users,
+                plot_message_heatmap_plotly,
+                get_chat_stats
+            )
 
-        if 'emotion' not in df.columns:
-            possible_emotion = [c for c in df.columns if 'emotion' in c.lower()]
-            if possible_emotion:
-                df['emotion'] = df[possible_emotion[0]]
+            # 🔹 Metrics
+            stats = get_chat_stats(df, cube=cube)
+
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Total Messages", stats['total_messages'])
+            c2.metric("Active Days", stats['active_days'])
+            c3.metric("Unique Senders", stats['unique_senders'])
+            c4.metric("Top Emotion", stats['top_emotion'])
+
+            # 📊 Emotion Distribution
+            st.subheader("Emotion Distribution")
+            fig = plot_emotion_distribution(df, cube=cube)
+            st.plotly_chart(fig, use_container_width=True)
+
+            # 📊 Top Active Users
+            st.subheader("Top Active Users")
+            st.plotly_chart(plot_top_users(df, cube=cube), use_container_width=True)
+
+            # 📊 Activity Heatmap
+            st.subheader("Activity Heatmap (Day vs Hour)")
+            st.plotly_chart(plot_message_heatmap_plotly(df, cube=cube), use_container_width=True)
+
+            # 📊 Emotion Trend
+            st.subheader("Emotion Trend Over Time")
+            # bucketed to at most TREND_MAX_POINTS points per emotion, whatever the chat length
+            t1, t2 = st.columns(2)
+            bucket = t1.selectbox("Bucket", ["auto", "minute", "hour", "day", "week", "month"], key="trend_bucket")
+            smooth = t2.slider("Smoothing (rolling mean, buckets)", 1, 14, 1, key="trend_smooth")
+            st.plotly_chart(plot_emotion_trend_plotly(df, cube=cube, bucket=None if bucket == "auto" else bucket,
+                                                      smooth=smooth), use_container_width=True)
+
+            # ☁️ Wordcloud & Heatmap
+            st.subheader("Wordcloud & Heatmap Images")
+            try:
+                wc, hm = tracked(insight_images, dataset_key(), df, cube)
+                st.image(wc, use_column_width=True)
+                st.image(hm, use_column_width=True)
+            except AdmissionError as e:
+                st.warning(f"⏳ {e}")
+
+            # 🚨 Risk screening: index lookups, no rescan of the chat
+            st.subheader("🚨 Risk Screening")
+            risk = st.session_state.get('risk')
+            if risk is None:
+                risk = st.session_state.risk = RiskIndex.from_frame(df)
+            scores = risk.risk_scores()
+            if scores.empty:
+                st.caption(f"No urgent, stressed or sad keywords in the last {RISK_WINDOW_DAYS} days of the chat.")
             else:
-                df['emotion'] = "neutral"
+                st.caption(f"Per-sender risk over the last {RISK_WINDOW_DAYS} days of the chat "
+                           f"(weights: {', '.join(f'{k} x{v:g}' for k, v in RISK_WEIGHTS.items())}).")
+                st.dataframe(scores, use_container_width=True)
+                who = st.selectbox("Urgent messages from", list(scores['sender']))
+                rows = risk.lookup('urgent', sender=who, last_days=RISK_WINDOW_DAYS)
+                if len(rows):
+                    st.dataframe(df.iloc[rows][['timestamp', 'sender', 'message']], use_container_width=True)
+                else:
+                    st.caption(f"No urgent messages from {who} in the last {RISK_WINDOW_DAYS} days.")
+
+        else:
+            st.info("Upload a chat to see insights.")
 
-        # 🔹 Metrics
-        total = len(df)
-        days = df['timestamp'].dt.date.nunique() if df['timestamp'].notna().any() else 0
-        unique_senders = df['sender'].nunique()
-        top_emotion = df['emotion'].mode().iloc[0] if not df['emotion'].mode().empty else "neutral"
-
-        c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Total Messages", total)
-        c2.metric("Active Days", days)
-        c3.metric("Unique Senders", unique_senders)
-        c4.metric("Top Emotion", top_emotion)
-
-        # 🔹 Imports for visualizations
-        from chat_statistics import (
-            plot_emotion_distribution,
-            plot_top_users,
-            plot_message_heatmap_plotly,
-            get_chat_stats
-        )
-        from advanced_visuals import (
-            generate_wordcloud,
-            generate_emotion_heatmap,
-            generate_emotion_pie_chart
-        )
-
-        # 📊 Emotion Distribution
-        st.subheader("Emotion Distribution")
-        fig = plot_emotion_distribution(df)
-        st.plotly_chart(fig, use_container_width=True)
-
-        # 📊 Top Active Users
-        st.subheader("Top Active Users")
-        st.plotly_chart(plot_top_users(df), use_container_width=True)
-
-        # 📊 Activity Heatmap
-        st.subheader("Activity Heatmap (Day vs Hour)")
-        st.plotly_chart(plot_message_heatmap_plotly(df), use_container_width=True)
-
-        # 📊 Emotion Trend
-        st.subheader("Emotion Trend Over Time")
-        st.plotly_chart(plot_emotion_trend_plotly(df), use_container_width=True)
-        save_emotion_trend_png(df)
-
-        # ☁️ Wordcloud & Heatmap
-        st.subheader("Wordcloud & Heatmap Images")
-        wc = generate_wordcloud(df)
-        st.image(wc, use_column_width=True)
-        hm = generate_emotion_heatmap(df)
-        st.image(hm, use_column_width=True)
+# --- Tab 3: Chatbot ---
+@st.cache_resource(show_spinner=False)
+def chat_service():
+    # one micro-batching service (own event loop thread) shared by every session
+    from chatbot_service import ThreadedChatbot
+    return ThreadedChatbot()
 
-    else:
-        st.info("Upload a chat to see insights.")
 
-# --- Tab 3: Chatbot ---
 with tab3:
     st.header("💬 AI Chatbot (Offline Mode)")
+    if tab3.open:
+        user_input = st.text_input("Type your message here...")
 
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+        if st.button("Send") and user_input.strip():
+            try:
+                # Latest detected emotion from the processed chat, if any
+                emotion_detected = None
+                if 'df' in st.session_state and 'emotion' in st.session_state.df.columns and len(st.session_state.df):
+                    emotion_detected = st.session_state.df['emotion'].iloc[-1]
 
-    user_input = st.text_input("Type your message here...")
+                # Reply within the latency budget (rule-based fallback when the backend is slow)
+                chat_service().ask(st.session_state.session_id, user_input, emotion_detected)
 
-    if st.button("Send") and user_input.strip():
-        try:
-            from chatbot_response import generate_response
-
-            # Detect emotion from Tab 1 data if available
-            emotion_detected = None
-            if 'df' in st.session_state and 'Emotion' in st.session_state.df.columns:
-                try:
-                    emotion_detected = st.session_state.df['Emotion'].iloc[-1]
-                except IndexError:
-                    pass
-
-            # Generate bot reply (offline)
-            bot_reply = generate_response(
-                user_input=user_input,
-                emotion=emotion_detected,
-                history=st.session_state.chat_history
-            )
-
-            # Save to chat history
-            st.session_state.chat_history.append((user_input, bot_reply))
+            except Exception as e:
+                st.error(f"⚠️ Error in chatbot: {e}")
 
-        except Exception as e:
-            st.error(f"⚠️ Error in chatbot: {e}")
-
-    # Display conversation
-    if st.session_state.chat_history:
-        st.markdown("### Conversation")
-        for user_msg, bot_msg in st.session_state.chat_history:
-            st.markdown(f"**You:** {user_msg}")
-            st.markdown(f"**Bot:** {bot_msg}")
+        # Display conversation: the service's ring buffer of this session's last exchanges
+        history = chat_service().history(st.session_state.session_id)
+        if history:
+            st.markdown("### Conversation")
+            st.markdown("\n\n".join(f"**You:** {u}  \n**Bot:** {b}" for u, b in history))
 
 with tab4:
     st.header("Export & Report")
-    if 'df' in st.session_state:
-        df = st.session_state.df
-        st.download_button("⬇️ Download CSV", data=df.to_csv(index=False).encode('utf-8'),
-                           file_name="chat_emotions.csv", mime="text/csv")
-        excel_path = export_excel(df)
-        with open(excel_path, "rb") as f:
-            st.download_button("⬇️ Download Excel", data=f,
-                               file_name="chat_emotions.xlsx",
-                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        png_zip = export_png_bundle(df)
-        with open(png_zip, "rb") as f:
-            st.download_button("⬇️ Download PNG Bundle (zip)", data=f,
-                               file_name="chat_images.zip", mime="application/zip")
-        pdf_path = generate_pdf_report(df)
-        with open(pdf_path, "rb") as f:
-            st.download_button("⬇️ Download PDF Report", data=f,
-                               file_name="chat_report.pdf", mime="application/pdf")
-    else:
-        st.info("Process a chat first to enable export.")
+    if tab4.open:
+        if 'df' in st.session_state:
+            df = st.session_state.df
+            cube = st.session_state.get('cube')
+            if cube is None:
+                cube = st.session_state.cube = build_cube(df)
+            try:
+                files = tracked(export_files, dataset_key(), df, cube)
+            except AdmissionError as e:
+                files = None
+                st.warning(f"⏳ {e}")
+            if files:
+                st.download_button("⬇️ Download CSV", data=files['csv'],
+                                   file_name="chat_emotions.csv", mime="text/csv")
+                st.download_button("⬇️ Download Excel", data=files['excel'],
+                                   file_name="chat_emotions.xlsx",
+                                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                st.download_button("⬇️ Download PNG Bundle (zip)", data=files['zip'],
+                                   file_name="chat_images.zip", mime="application/zip")
+                st.download_button("⬇️ Download PDF Report", data=files['pdf'],
+                                   file_name="chat_report.pdf", mime="application/pdf")
+        else:
+            st.info("Process a chat first to enable export.")
+
+# --- Performance panel ---
+if show_perf:
+    with st.expander("⏱️ Performance", expanded=True):
+        records = st.session_state.get('perf', [])
+        if records:
+            perf_df = pd.DataFrame(records)
+            perf_df['rows_per_s'] = (perf_df['rows'] / perf_df['seconds']).round()
+            st.dataframe(perf_df[['stage', 'parent', 'seconds', 'rows', 'rows_per_s', 'cache_hits',
+                                  'cache_misses', 'rss_delta_mb', 'rss_mb']], use_container_width=True)
+            st.caption("Stages of the run that produced the current results; cached steps do not appear.")
+        else:
+            st.info("No pipeline stages recorded yet in this session.")
+        st.download_button("⬇️ Prometheus metrics (process totals)", data=prometheus_text(),
+                           file_name="metrics.prom", mime="text/plain")
+        if MULTI_TENANT:
+            st.caption("Shared worker pool")
+            st.json(job_pool().snapshot())
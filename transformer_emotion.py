@@ -1,22 +1,78 @@
 # Optional transformer-based classifier (imports inside function to avoid heavy import at module load)
-def predict_with_transformer(df, model_name="j-hartmann/emotion-english-distilroberta-base"):
+import os
+from functools import lru_cache
+
+from instrumentation import output_rows, stage
+
+DEFAULT_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+BATCH_SIZE = 32
+MAX_TOKENS = 128
+
+
+@lru_cache(maxsize=None)
+def load_engine(model_name=DEFAULT_MODEL):
     """
-    Predict emotions using a Hugging Face transformers pipeline.
+    Load tokenizer + model once per process and keep them for later calls
+    (and Streamlit reruns). Requires: transformers, torch
+    """
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    return tokenizer, model
+
+
+def classify_texts(texts, model_name=DEFAULT_MODEL, batch_size=BATCH_SIZE, max_tokens=MAX_TOKENS, num_threads=None):
+    """
+    Classify a list of strings and return one label per input, in input order.
+    Texts are sorted by length so each padded batch holds similar-sized inputs,
+    and run under torch.inference_mode() on CPU. `num_threads` (or the
+    TRANSFORMER_THREADS env var) sets torch's intra-op thread count.
+    A batch that fails is labelled 'neutral', like a failed message before.
+    """
+    import torch
+    num_threads = num_threads or int(os.environ.get("TRANSFORMER_THREADS", 0))
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    tokenizer, model = load_engine(model_name)
+    id2label = model.config.id2label
+
+    labels = ['neutral'] * len(texts)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            try:
+                enc = tokenizer([texts[i] for i in idx], padding=True, truncation=True,
+                                max_length=max_tokens, return_tensors="pt")
+                preds = model(**enc).logits.argmax(dim=-1).tolist()
+            except Exception:
+                continue
+            for i, p in zip(idx, preds):
+                labels[i] = id2label[p]
+    return labels
+
+
+@stage('transformer', rows=output_rows)
+def predict_with_transformer(df, model_name=DEFAULT_MODEL, batch_size=BATCH_SIZE, max_tokens=MAX_TOKENS, num_threads=None,
+                             use_cache=True):
+    """
+    Predict emotions using a Hugging Face transformers model.
+    With `use_cache`, only unique messages missing from the label cache are run through the model.
     Requires: transformers, torch
     """
-    from transformers import pipeline
     import pandas as pd
-    classifier = pipeline("text-classification", model=model_name, top_k=1)
-    df = df.copy()
-    emotions = []
-    for text in df['message'].fillna(''):
-        try:
-            res = classifier(text)
-            if isinstance(res, list):
-                emotions.append(res[0]['label'])
-            else:
-                emotions.append(res['label'])
-        except Exception:
-            emotions.append('neutral')
-    df['emotion'] = emotions
-    return df
+    from label_cache import cached_labels
+    texts = df['message'].fillna('').astype(str).tolist()
+
+    def classify(batch):
+        return classify_texts(batch, model_name, batch_size, max_tokens, num_threads)
+
+    if use_cache:
+        # truncation length changes what the model sees, so it is part of the version
+        emotions = cached_labels(texts, 'transformer', f"{model_name}@{max_tokens}", classify)
+    else:
+        emotions = classify(texts)
+    out = df.assign(emotion=pd.Categorical(emotions))
+    out.attrs['classifier'] = f"transformer:{model_name}@{max_tokens}"
+    return out
@@ -1,3 +1,10 @@
+import os
+import re
+from functools import lru_cache
+
+from instrumentation import output_rows, stage
+
+# built-in entries; the full lexicon is loaded from hinglish_lexicon.tsv (or HINGLISH_LEXICON)
 MAP = {
     'mujhe': 'me',
     'bhut': 'very',
@@ -14,10 +21,108 @@ MAP = {
     'madad': 'help',
     'marna': 'die'
 }
+LEXICON_PATH = os.environ.get("HINGLISH_LEXICON", os.path.join(os.path.dirname(os.path.abspath(__file__)), "hinglish_lexicon.tsv"))
+
+# words are runs of letters/digits, so trailing punctuation ("nahi,") no longer blocks a match
+TOKEN = re.compile(r"\w+")
+REPEATS = re.compile(r"(\w)\1+")
+
+
+def squeeze(word):
+    # "nahiii" / "achha" -> "nahi" / "acha": spelling variants that only differ by repeated letters
+    return REPEATS.sub(r"\1", word)
+
+
+@lru_cache(maxsize=None)
+def english_words():
+    """Known English words (TextBlob's spelling corpus, read without importing textblob); empty if not installed."""
+    from importlib.util import find_spec
+    spec = find_spec("textblob")
+    if spec is None or not spec.submodule_search_locations:
+        return frozenset()
+    path = os.path.join(spec.submodule_search_locations[0], "en", "en-spelling.txt")
+    if not os.path.exists(path):
+        return frozenset()
+    with open(path, encoding="utf-8") as f:
+        return frozenset(line.split()[0].lower() for line in f if line.strip() and not line.startswith(';'))
+
+
+def load_lexicon(path=LEXICON_PATH):
+    """Read a <hinglish>\t<english> file into a dict; missing file -> built-in MAP only."""
+    lexicon = dict(MAP)
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                variant, _, english = line.partition('\t')
+                if variant and english:
+                    lexicon[variant.strip().lower()] = english.strip()
+    return lexicon
+
+
+class Translator:
+    """
+    Token-level Hinglish -> English replacement. Each token costs one dict
+    lookup (plus one on its squeezed form), so the cost grows with the text
+    length and not with the lexicon size.
+    The squeezed form is only tried for tokens with repeated letters that are
+    not English words ("nahiii", not "seen"), and never maps onto an English
+    word, so "ha ha" stays as it is although "haa" is in the lexicon.
+    """
+
+    def __init__(self, lexicon, words=None):
+        self.lexicon = lexicon
+        self.words = english_words() if words is None else words
+        self.squeezed = {}
+        for variant, english in lexicon.items():
+            key = squeeze(variant)
+            # a real lexicon key or an English word is never reached through squeezing
+            if key not in lexicon and key not in self.words:
+                self.squeezed.setdefault(key, english)
+        # chat vocabularies are small and repetitive, so memoize per distinct token
+        self._lookup = lru_cache(maxsize=200_000)(self._lookup_word)
+
+    def _lookup_word(self, word):
+        lower = word.lower()
+        english = self.lexicon.get(lower)
+        if english is None and REPEATS.search(lower) and lower not in self.words:
+            key = squeeze(lower)
+            english = self.lexicon.get(key) or self.squeezed.get(key)
+        return word if english is None else english
+
+    def _replace(self, m):
+        return self._lookup(m.group(0))
+
+    def translate(self, text):
+        if not isinstance(text, str):
+            return text
+        return TOKEN.sub(self._replace, text)
+
+    def translate_series(self, series):
+        """Translate a whole message column: each distinct string once, word lookups memoized."""
+        unique = [t for t in series.unique() if isinstance(t, str)]
+        if not unique:
+            return series
+        translated = [TOKEN.sub(self._replace, t) for t in unique]
+        return series.map(dict(zip(unique, translated))).where(series.map(lambda t: isinstance(t, str)), series)
+
+
+_translator = None
+
+
+def get_translator():
+    global _translator
+    if _translator is None:
+        _translator = Translator(load_lexicon())
+    return _translator
+
 
 def translate_hinglish_to_english(text):
-    if not isinstance(text, str):
-        return text
-    words = text.split()
-    out = [MAP.get(w.lower(), w) for w in words]
-    return ' '.join(out)
+    return get_translator().translate(text)
+
+
+@stage('translate', rows=output_rows)
+def translate_series(series):
+    return get_translator().translate_series(series)